@@ -0,0 +1,99 @@
+# adaptive.py
+
+
+class AdaptivePace:
+    """Adjusts reading speed during playback without recompiling the schedule.
+
+    The schedule is compiled once at the target WPM; this controller only
+    returns a factor for each chunk's compiled delay as it is played, so a
+    change in speed applies to the rest of the document immediately and at
+    no cost. The speed ramps from start_wpm up to the target over
+    ramp_seconds of reading, slows down ahead of passages that are denser
+    than the document's average (long words, heavy punctuation), backs
+    off when the user rewinds, and never lets a chunk get so short that
+    measured frame overhead would eat a large part of it. That overhead is
+    the reader's wake-up lateness plus the render cost the view reports
+    through report_render_cost(), since drawing happens on another thread.
+    """
+
+    def __init__(self, target_wpm, start_wpm=None, ramp_seconds=120.0, lookahead=8,
+                 sensitivity=1.0, smoothing=0.2, max_overhead_share=0.1,
+                 rewind_penalty=20.0):
+        self.target_wpm = target_wpm
+        self.start_wpm = start_wpm or max(100, int(target_wpm * 0.6))
+        self.ramp_seconds = ramp_seconds
+        self.lookahead = lookahead  # chunks looked ahead for density
+        self.sensitivity = sensitivity
+        self.smoothing = smoothing
+        self.max_overhead_share = max_overhead_share
+        self.rewind_penalty = rewind_penalty  # seconds of ramp lost per rewind
+        self.reset()
+
+    def reset(self):
+        self.reading_time = 0.0  # seconds of playback so far, pauses excluded
+        self.overhead = 0.0  # smoothed per-frame lateness, seconds
+        self.render_cost = 0.0  # smoothed time from frame creation to drawn, seconds
+        self.factor = None
+        self.current_wpm = self.start_wpm
+
+    def ramp_wpm(self):
+        """Speed along the ramp, eased so it neither jumps nor stalls at the top."""
+        if self.ramp_seconds <= 0 or self.start_wpm >= self.target_wpm:
+            return self.target_wpm
+        progress = min(1.0, self.reading_time / self.ramp_seconds)
+        eased = progress * progress * (3 - 2 * progress)
+        return self.start_wpm + (self.target_wpm - self.start_wpm) * eased
+
+    def density(self, schedule, index):
+        """Mean delay of the next few chunks relative to the document's average."""
+        count = len(schedule.elapsed)
+        if not count or not schedule.total_time:
+            return 1.0
+        end = min(count, index + self.lookahead)
+        window_end = schedule.elapsed[end] if end < count else schedule.total_time
+        window = (window_end - schedule.elapsed[index]) / max(1, end - index)
+        average = schedule.total_time / count
+        return window / average
+
+    def delay_factor(self, schedule, index, lateness=0.0):
+        """Multiplier for the compiled delay of chunk index, which is about to play."""
+        self.overhead += 0.1 * (lateness - self.overhead)
+
+        wpm = self.ramp_wpm()
+        dense = self.density(schedule, index)
+        if dense > 1.0:
+            wpm /= 1 + self.sensitivity * (dense - 1.0)
+        factor = schedule.wpm / wpm
+
+        # Keep frame overhead a small share of each chunk's time on screen
+        delay = schedule.delays[index]
+        overhead = self.overhead + self.render_cost
+        if delay > 0 and overhead > 0:
+            factor = max(factor, overhead / self.max_overhead_share / delay)
+
+        # Smooth so the rhythm changes gradually rather than word to word
+        if self.factor is None:
+            self.factor = factor
+        else:
+            self.factor += self.smoothing * (factor - self.factor)
+        self.current_wpm = schedule.wpm / self.factor
+        self.reading_time += delay * self.factor
+        return self.factor
+
+    def report_render_cost(self, seconds):
+        """How long the view took to get a frame on screen after it was made."""
+        self.render_cost += 0.1 * (seconds - self.render_cost)
+
+    def schedule_changed(self, old_wpm, new_wpm):
+        """The reader switched to a schedule compiled at new_wpm.
+
+        factor multiplies compiled delays, which shrink as the schedule's
+        WPM grows, so it is rescaled to keep the smoothed speed where it was
+        instead of jumping by the WPM ratio.
+        """
+        if self.factor is not None and old_wpm != new_wpm:
+            self.factor *= new_wpm / old_wpm
+
+    def rewound(self):
+        """The user went back: they're not keeping up, so ease off the ramp."""
+        self.reading_time = max(0.0, self.reading_time - self.rewind_penalty)
@@ -0,0 +1,228 @@
+# benchmarks.py
+"""Throughput benchmarks for the text pipeline and the reading engine.
+
+Run with `python benchmarks.py`, or name the benchmarks to run, e.g.
+`python benchmarks.py compile tick`. `--json results.json` also writes the
+numbers to a file so a headless CI job can compare them between commits.
+Timings use timeit and report the best of several runs, so the numbers are
+comparable between machines only in ratio, not in absolute terms.
+"""
+import argparse
+import json
+import re
+import time
+import timeit
+import tracemalloc
+
+from document import Document
+from engine import DEFAULT_PUNCTUATION_DELAYS, ReaderView, ReadingEngine
+from orp import FocusLayout, GlyphWidths
+from pacing import DeadlineScheduler
+from parallel import default_workers, preprocess_text_parallel
+from schedule import chunk_means, compile_schedule, token_delays, word_delay
+from tokenizer import tokenize
+
+SAMPLE_PARAGRAPH = (
+    "It was the best of times, it was the worst of times; it was the age of "
+    "wisdom, it was the age of foolishness. In 1859 there were 2 kings (one "
+    "with a large jaw) and 1 queen - each was certain: things would last "
+    "forever! Wasn't it? \"Perhaps,\" said the well-known author.\n\n"
+)
+
+
+def make_text(megabytes):
+    repeats = int(megabytes * 1024 * 1024 / len(SAMPLE_PARAGRAPH)) + 1
+    return SAMPLE_PARAGRAPH * repeats
+
+
+def legacy_preprocess(text):
+    """The original three-pass preprocessing, kept as a baseline."""
+    def number_to_words(match):
+        return match.group(0)
+
+    text = re.sub(r'\b\d+\b', number_to_words, text)
+    text = re.sub(r'([^\w\s])', r' \1 ', text)
+    return ' '.join(text.split()).split()
+
+
+def best_time(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def report(name, seconds, megabytes):
+    print(f"{name:<36} {seconds * 1000:9.1f} ms  {megabytes / seconds:8.1f} MB/s")
+
+
+class VirtualClock:
+    """Clock and sleep for DeadlineScheduler that never actually waits."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class CountingView(ReaderView):
+    """Counts frames and times playback from the first frame to the end."""
+
+    def __init__(self):
+        self.frames = 0
+        self.first_frame = None
+        self.finished = None
+
+    def show_frame(self, frame):
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter()
+        self.frames += 1
+
+    def reading_finished(self):
+        self.finished = time.perf_counter()
+
+
+def bench_tokenizer(megabytes=8):
+    text = make_text(megabytes)
+    size = len(text.encode("utf-8")) / (1024 * 1024)
+    assert legacy_preprocess(text) == tokenize(text)
+
+    print(f"Tokenizer on {size:.1f} MB")
+    legacy = best_time(lambda: legacy_preprocess(text))
+    current = best_time(lambda: tokenize(text))
+    report("legacy preprocess_text + split", legacy, size)
+    report("tokenize", current, size)
+    return {"legacy_mb_per_s": size / legacy, "tokenize_mb_per_s": size / current}
+
+
+def bench_parallel(megabytes=32):
+    text = make_text(megabytes)
+    size = len(text.encode("utf-8")) / (1024 * 1024)
+    workers = default_workers()
+
+    print(f"Preprocessing {size:.1f} MB into a Document, {workers} workers")
+    serial = best_time(lambda: Document.from_text(text), repeat=1)
+    parallel = best_time(lambda: preprocess_text_parallel(text, workers),
+                         repeat=1)
+    report("serial Document.from_text", serial, size)
+    report("preprocess_text_parallel", parallel, size)
+    return {"serial_mb_per_s": size / serial, "parallel_mb_per_s": size / parallel,
+            "workers": workers}
+
+
+def bench_delays(megabytes=4, words_per_chunk=3):
+    tokens = tokenize(make_text(megabytes))
+    chunk_delay = 60 / 300 * words_per_chunk
+
+    def per_word():
+        return [sum(word_delay(word, chunk_delay, DEFAULT_PUNCTUATION_DELAYS)
+                    for word in tokens[i:i + words_per_chunk])
+                / len(tokens[i:i + words_per_chunk])
+                for i in range(0, len(tokens), words_per_chunk)]
+
+    def batch():
+        return chunk_means(token_delays(tokens, chunk_delay, DEFAULT_PUNCTUATION_DELAYS),
+                           words_per_chunk)
+
+    millions = len(tokens) / 1e6
+    print(f"Chunk delays for {len(tokens)} tokens")
+    results = {}
+    for key, name, func in (("per_word", "per-word word_delay", per_word),
+                            ("batch", "batch token_delays", batch)):
+        seconds = best_time(func)
+        print(f"{name:<36} {seconds * 1000:9.1f} ms  {millions / seconds:8.2f} M tokens/s")
+        results[f"{key}_mtokens_per_s"] = millions / seconds
+    return results
+
+
+def bench_compile(megabytes=4):
+    document = Document.from_text(make_text(megabytes))
+    millions = len(document) / 1e6
+
+    print(f"Schedule compilation for {len(document)} tokens")
+    results = {}
+    for words_per_chunk in (1, 3):
+        seconds = best_time(lambda: compile_schedule(document, 300, words_per_chunk,
+                                                     DEFAULT_PUNCTUATION_DELAYS))
+        print(f"{f'compile_schedule, {words_per_chunk} per chunk':<36} "
+              f"{seconds * 1000:9.1f} ms  {millions / seconds:8.2f} M tokens/s")
+        results[f"chunk_{words_per_chunk}_mtokens_per_s"] = millions / seconds
+    return results
+
+
+def bench_tick(megabytes=1):
+    """Per-frame cost of the reader loop, run headless on a virtual clock."""
+    text = make_text(megabytes)
+
+    def play():
+        clock = VirtualClock()
+        view = CountingView()
+        # No search index, so no thread competes with the reader
+        engine = ReadingEngine(view=view, wpm=1000, indexing=False,
+                               pacer=DeadlineScheduler(clock=clock, sleep=clock.sleep))
+        engine.start(text=text, background=False)
+        # Tokenizing and compiling are done before the first frame is shown
+        return view.frames, view.finished - view.first_frame
+
+    runs = [play() for _ in range(3)]
+    frames = runs[0][0]
+    ticks = frames - 1  # timing starts once the first frame is up
+    seconds = min(seconds for _, seconds in runs)
+
+    print(f"Reader loop over {frames} frames")
+    print(f"{'per tick':<36} {seconds / ticks * 1e6:9.2f} us  {ticks / seconds:8.0f} ticks/s")
+    return {"tick_us": seconds / ticks * 1e6}
+
+
+def bench_memory(words=1_000_000):
+    text = make_text(1)
+    repeats = words // len(tokenize(text)) + 1
+
+    # As the window lays out focus letters; without Tk every glyph is one width
+    focus_layout = FocusLayout(GlyphWidths({}, 20.0), 36)
+
+    tracemalloc.start()
+    document = Document.from_text(text * repeats)
+    document_bytes = tracemalloc.get_traced_memory()[0]
+    schedule = compile_schedule(document, 300, 1, DEFAULT_PUNCTUATION_DELAYS,
+                                focus_layout=focus_layout)
+    total_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Current, not peak, usage: the source text is freed once tokenized
+    per_million = 1e6 / len(document)
+    print(f"Memory for {len(document)} words ({len(schedule)} chunks)")
+    print(f"{'document':<36} {document_bytes * per_million / 2 ** 20:9.1f} MB per million words")
+    print(f"{'document + schedule':<36} {total_bytes * per_million / 2 ** 20:9.1f} MB per million words")
+    return {"document_mb_per_mword": document_bytes * per_million / 2 ** 20,
+            "total_mb_per_mword": total_bytes * per_million / 2 ** 20}
+
+
+BENCHMARKS = {
+    "tokenizer": bench_tokenizer,
+    "parallel": bench_parallel,
+    "delays": bench_delays,
+    "compile": bench_compile,
+    "tick": bench_tick,
+    "memory": bench_memory,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--json", metavar="PATH", help="also write results to PATH")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        results[name] = BENCHMARKS[name]()
+        print()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,159 @@
+# cli.py
+"""Headless commands, run as `python speed_reader.py <command> ...`."""
+import argparse
+import math
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from document_cache import DocumentCache, content_hasher, file_fingerprint
+from engine import DEFAULT_PUNCTUATION_DELAYS
+from lexicon import build_lexicon, count_words, default_user_lexicon_path
+from parallel import SHARD_SIZE, default_workers, ordered_map, preprocess_file_parallel
+from report import REPORT_WRITERS, iter_text_files, report_file
+
+
+def positive_int(value):
+    """argparse type for counts and rates that must be at least 1."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, not {value}")
+    return number
+
+
+def positive_float(value):
+    """argparse type for sizes that must be above zero."""
+    number = float(value)
+    if not (number > 0 and math.isfinite(number)):
+        raise argparse.ArgumentTypeError(f"must be a positive number, not {value}")
+    return number
+
+
+def preprocess_command(args):
+    """Tokenize files in parallel and store them in the document cache."""
+    cache = DocumentCache()
+    workers = args.workers or default_workers()
+    shard_size = max(1, int(args.shard_mb * 1024 * 1024))
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in args.files:
+            started = time.perf_counter()
+            try:
+                fingerprint = file_fingerprint(path)
+                hasher = content_hasher()
+                document = preprocess_file_parallel(path, pool, workers,
+                                                    shard_size, hasher)
+            except (OSError, ValueError) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            key = hasher.hexdigest()
+            cache.store(key, document)
+            cache.remember_file(fingerprint, key)
+            print(f"{path}: {len(document)} words in "
+                  f"{time.perf_counter() - started:.2f} s")
+    return 1 if failed else 0
+
+
+def report_command(args):
+    """Print reading-time reports for many documents as JSON or CSV."""
+    workers = args.workers or default_workers()
+    punctuation_delays = dict(DEFAULT_PUNCTUATION_DELAYS)
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writer = REPORT_WRITERS[args.format](output, punctuation_delays)
+    failed = 0
+    found = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for record in ordered_map(pool, report_file, iter_text_files(args.paths),
+                                      4 * workers, args.wpm, args.chunk_size,
+                                      punctuation_delays):
+                found += 1
+                if "error" in record:
+                    print(f"{record['path']}: {record['error']}", file=sys.stderr)
+                    failed += 1
+                    continue
+                writer.write(record)
+        if not found:
+            print(f"No text, EPUB or HTML files found in {' '.join(args.paths)}",
+                  file=sys.stderr)
+            return 1
+        writer.close()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+def lexicon_command(args):
+    """Rank the words of a corpus by frequency and write them as the reader's lexicon."""
+    workers = args.workers or default_workers()
+    totals = Counter()
+    failed = 0
+    found = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, counts, error in ordered_map(pool, count_words, iter_text_files(args.paths),
+                                               4 * workers):
+            found += 1
+            if error is not None:
+                print(f"{path}: {error}", file=sys.stderr)
+                failed += 1
+                continue
+            totals.update(counts)
+    if not found:
+        # Rather than replace the user's lexicon with an empty one
+        print(f"No text, EPUB or HTML files found in {' '.join(args.paths)}",
+              file=sys.stderr)
+        return 1
+    ranked = [word for word, count in totals.most_common() if count >= args.min_count]
+    output = args.output or default_user_lexicon_path()
+    build_lexicon(ranked, output)
+    print(f"{output}: {len(ranked)} words")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="speed_reader.py",
+                                     description="FocusFlow headless commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    preprocess = commands.add_parser(
+        "preprocess", help="tokenize files ahead of time into the document cache")
+    preprocess.add_argument("files", nargs="+", metavar="FILE")
+    preprocess.add_argument("--workers", type=positive_int, default=None,
+                            help="worker processes (default: one per CPU)")
+    preprocess.add_argument("--shard-mb", type=positive_float, default=SHARD_SIZE / (1024 * 1024),
+                            help="size of the pieces handed to each worker")
+    preprocess.set_defaults(run=preprocess_command)
+
+    report = commands.add_parser(
+        "report", help="estimate reading times for directories or globs of text, EPUB and HTML files")
+    report.add_argument("paths", nargs="+", metavar="PATH",
+                        help="a directory (searched recursively) or a glob")
+    report.add_argument("--wpm", type=positive_int, default=300)
+    report.add_argument("--chunk-size", type=positive_int, default=1,
+                        help="words shown at a time")
+    report.add_argument("--format", choices=sorted(REPORT_WRITERS), default="json")
+    report.add_argument("--output", "-o", help="write to a file instead of stdout")
+    report.add_argument("--workers", type=positive_int, default=None,
+                        help="worker processes (default: one per CPU)")
+    report.set_defaults(run=report_command)
+
+    lexicon = commands.add_parser(
+        "lexicon", help="build the word-frequency lexicon from directories or globs of text, EPUB and HTML files")
+    lexicon.add_argument("paths", nargs="+", metavar="PATH",
+                         help="a directory (searched recursively) or a glob")
+    lexicon.add_argument("--min-count", type=positive_int, default=2,
+                         help="leave out words seen fewer times than this")
+    lexicon.add_argument("--output", "-o",
+                         help="where to write it (default: the user lexicon the reader loads)")
+    lexicon.add_argument("--workers", type=positive_int, default=None,
+                         help="worker processes (default: one per CPU)")
+    lexicon.set_defaults(run=lexicon_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.run(args)
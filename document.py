@@ -0,0 +1,179 @@
+# document.py
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, compress, count
+
+from tokenizer import tokenize_paragraphs
+
+# Tokens that end a sentence
+SENTENCE_ENDINGS = frozenset(".!?")
+# The same tokens as they start an encoded block
+ENCODED_ENDINGS = frozenset(ending.encode() + b" " for ending in SENTENCE_ENDINGS)
+
+
+def find_sentence_starts(tokens):
+    """Offsets just past each run of sentence-ending tokens, relative to tokens."""
+    # Candidates are found at C speed; only the (sparse) endings are checked
+    ends = compress(count(1), map(SENTENCE_ENDINGS.__contains__, tokens))
+    last = len(tokens)
+    return [end for end in ends
+            if end == last or tokens[end] not in SENTENCE_ENDINGS]
+
+
+class Document:
+    """Token stream plus the sentence and paragraph offsets used for seeking.
+
+    Behaves like a read-only list of tokens, so a ReadingSchedule can be
+    compiled straight from it. Tokens can be appended while a file is
+    still streaming in.
+
+    Tokens are stored as UTF-8 rather than as str objects: each batch
+    appended is one immutable bytes block with every token followed by a
+    space, and a uint32 array holds the byte offset of each token in its
+    block, plus the block's length as a sentinel. A run of tokens within a
+    block is therefore already its own space-joined chunk, so chunk_view
+    returns it as a memoryview without copying. Tokens are decoded only
+    when asked for; one-character tokens such as punctuation decode to
+    Python's shared one-character strings, so they are never duplicated.
+    English text costs about 10 bytes per word (5 to 6 bytes of text, 4 of
+    offset) against roughly 60 for a list of str.
+    """
+
+    def __init__(self):
+        self.blocks = []  # UTF-8 bytes, each token followed by one space
+        self.block_starts = array('I')  # index of the first token in each block
+        # Byte offset of every token within its block; block b's offsets start
+        # at index block_starts[b] + b and end with the block's length
+        self.offsets = array('I')
+        self.count = 0
+        self.sentence_starts = array('I')
+        self.paragraph_starts = array('I')
+
+    @classmethod
+    def from_text(cls, text):
+        document = cls()
+        document.extend(*tokenize_paragraphs(text))
+        return document
+
+    @classmethod
+    def from_parts(cls, block, offsets, sentence_starts, paragraph_starts):
+        """Rebuild a document from one encoded block and its offsets, as cached."""
+        document = cls()
+        document.blocks.append(block)
+        document.block_starts.append(0)
+        document.offsets = offsets
+        document.count = len(offsets) - 1
+        document.sentence_starts = sentence_starts
+        document.paragraph_starts = paragraph_starts
+        return document
+
+    def __len__(self):
+        return self.count
+
+    def _locate(self, index):
+        """(block, position in offsets) of token index."""
+        block = bisect_right(self.block_starts, index) - 1
+        return self.blocks[block], index + block
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            return str(self.chunk_view(start, stop), "utf-8").split(" ")
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Document index out of range")
+        block, position = self._locate(index)
+        offsets = self.offsets
+        return str(block[offsets[position]:offsets[position + 1] - 1], "utf-8")
+
+    def chunk_view(self, start, stop):
+        """UTF-8 bytes of tokens start to stop, joined by single spaces.
+
+        A memoryview into the stored block, unless the range crosses into
+        another streamed batch, when the pieces are joined into a copy.
+        """
+        offsets = self.offsets
+        block, position = self._locate(start)
+        last_block, last_position = self._locate(stop - 1)
+        if block is last_block:
+            return memoryview(block)[offsets[position]:offsets[last_position + 1] - 1]
+        pieces = []
+        index = start
+        while index < stop:
+            block, position = self._locate(index)
+            number = position - index
+            block_end = (self.block_starts[number + 1]
+                         if number + 1 < len(self.block_starts) else self.count)
+            end = min(stop, block_end)
+            pieces.append(block[offsets[position]:offsets[position + end - index] - 1])
+            index = end
+        return memoryview(b" ".join(pieces))
+
+    def chunk_text(self, start, stop):
+        """Tokens start to stop joined by single spaces, decoded straight from storage."""
+        return str(self.chunk_view(start, stop), "utf-8")
+
+    def extend(self, tokens, paragraph_starts=(), sentence_starts=None):
+        """Append tokens; paragraph_starts are offsets relative to this batch.
+
+        sentence_starts, also relative, are found here unless the caller
+        already computed them with find_sentence_starts.
+        """
+        if not tokens:
+            return
+        if sentence_starts is None:
+            sentence_starts = find_sentence_starts(tokens)
+        text = " ".join(tokens)
+        sizes = map(len, tokens) if text.isascii() else map(len, map(str.encode, tokens))
+        self._append((text + " ").encode("utf-8"), len(tokens), sizes,
+                     paragraph_starts, sentence_starts)
+
+    def extend_joined(self, text, count, paragraph_starts, sentence_starts):
+        """Append count tokens already joined by single spaces, as workers return them."""
+        if not count:
+            return
+        block = (text + " ").encode("utf-8")
+        sizes = map(len, text.split(" ")) if text.isascii() else map(len, block[:-1].split(b" "))
+        self._append(block, count, sizes, paragraph_starts, sentence_starts)
+
+    def _append(self, block, count, sizes, paragraph_starts, sentence_starts):
+        offset = self.count
+        if offset == 0:
+            self.sentence_starts.append(0)
+            self.paragraph_starts.append(0)
+
+        if offset and block[:2] in ENCODED_ENDINGS and self[-1] in SENTENCE_ENDINGS:
+            # "?!" split across two batches ends only one sentence
+            self.sentence_starts.pop()
+        if offset:
+            sentence_starts = [offset + start for start in sentence_starts]
+        self.sentence_starts.extend(sentence_starts)
+        self.paragraph_starts.extend(offset + start for start in paragraph_starts
+                                     if offset + start > 0)
+
+        # Appended in this order, count last, so a reader on another thread
+        # never sees a token before its block and offsets are in place
+        self.offsets.extend(accumulate(map((1).__add__, sizes), initial=0))
+        self.blocks.append(block)
+        self.block_starts.append(offset)
+        self.count = offset + count
+
+    def seek_sentence(self, word_index, count):
+        """Word offset of the sentence `count` sentences away from word_index."""
+        return self._seek(self.sentence_starts, word_index, count)
+
+    def seek_paragraph(self, word_index, count):
+        """Word offset of the paragraph `count` paragraphs away from word_index."""
+        return self._seek(self.paragraph_starts, word_index, count)
+
+    def _seek(self, starts, word_index, count):
+        if not starts:
+            return 0
+        current = bisect_right(starts, word_index) - 1
+        target = max(0, min(current + count, len(starts) - 1))
+        return min(starts[target], max(0, self.count - 1))
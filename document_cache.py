@@ -0,0 +1,215 @@
+# document_cache.py
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from document import Document
+from tokenizer import TOKENIZER_VERSION
+
+# File layout: header, token byte offsets, sentence starts, paragraph starts,
+# then every token followed by a single space as one UTF-8 blob. All arrays
+# are uint32 in native byte order, so the file can be mapped and sliced
+# directly. The offsets and blob are exactly a Document's storage for a
+# single block, so loading needs no tokenizing, splitting or str objects.
+MAGIC = b"FFDC"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("=4sHHBxxxIIIQ")
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "focusflow", "documents")
+
+
+def content_hasher():
+    """Hash object for a document's source bytes, seeded with the tokenizer version."""
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"focusflow-tokenizer-{TOKENIZER_VERSION}\0".encode("ascii"))
+    return hasher
+
+
+def key_for_text(text):
+    hasher = content_hasher()
+    hasher.update(text.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def file_fingerprint(file_path):
+    """Cheap identity for a file on disk: path, size and modification time."""
+    stat = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+class DocumentCache:
+    """On-disk cache of tokenized documents keyed by content hash.
+
+    Entries are evicted least recently used first once the cache grows past
+    max_bytes; a hit refreshes the entry's modification time. A small index
+    maps file fingerprints to content hashes so reopening a large file does
+    not have to hash it again before playback can start.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.directory, "index.json")
+        self._lock = threading.Lock()
+        self._files = None
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + ".doc")
+
+    def load(self, key):
+        """Return the cached Document for key, or None on a miss."""
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    document = self._decode(data)
+            os.utime(path)
+            return document
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, UnicodeDecodeError, struct.error):
+            # Corrupt or foreign entry; drop it so it is rebuilt
+            self._remove(path)
+            return None
+
+    def store(self, key, document):
+        """Write a document to the cache atomically, then enforce the size cap."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.entry_path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as file:
+                self._encode(document, file)
+            os.replace(temp_path, path)
+            self.evict()
+        except OSError:
+            # A cache that can't be written is just a cache miss next time
+            pass
+
+    def store_async(self, key, document, fingerprint=None):
+        def run():
+            self.store(key, document)
+            if fingerprint:
+                self.remember_file(fingerprint, key)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def key_for_file(self, fingerprint):
+        """Content hash previously recorded for a file fingerprint, if any."""
+        with self._lock:
+            key = self._load_index().get(fingerprint)
+        if key and os.path.exists(self.entry_path(key)):
+            return key
+        return None
+
+    def remember_file(self, fingerprint, key):
+        with self._lock:
+            files = self._load_index()
+            files[fingerprint] = key
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = self.index_path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    json.dump(files, file)
+                os.replace(temp_path, self.index_path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        try:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".doc"):
+                    path = os.path.join(self.directory, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _load_index(self):
+        if self._files is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as file:
+                    self._files = json.load(file)
+            except (OSError, ValueError):
+                self._files = {}
+        return self._files
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _encode(self, document, file):
+        # Streamed documents hold one block per batch; the file holds one
+        # block, so each block's offsets are shifted by the bytes before it
+        blocks, count = document.blocks, len(document)
+        offsets = array('I')
+        base = 0
+        for number, block in enumerate(blocks):
+            first = document.block_starts[number] + number
+            last = (document.block_starts[number + 1] + number + 1
+                    if number + 1 < len(blocks) else count + number + 1)
+            offsets.extend(map(base.__add__, document.offsets[first:last - 1]))
+            base += len(block)
+        offsets.append(base)
+
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, TOKENIZER_VERSION,
+                               sys.byteorder == "little", count,
+                               len(document.sentence_starts),
+                               len(document.paragraph_starts), base))
+        offsets.tofile(file)
+        document.sentence_starts.tofile(file)
+        document.paragraph_starts.tofile(file)
+        for block in blocks:
+            file.write(block)
+
+    def _decode(self, data):
+        (magic, format_version, tokenizer_version, little_endian, token_count,
+         sentence_count, paragraph_count, blob_size) = HEADER.unpack_from(data, 0)
+        if (magic != MAGIC or format_version != FORMAT_VERSION
+                or tokenizer_version != TOKENIZER_VERSION
+                or bool(little_endian) != (sys.byteorder == "little")):
+            raise ValueError("Incompatible cache entry")
+
+        position = HEADER.size
+
+        def read_array(count):
+            nonlocal position
+            values = array('I')
+            values.frombytes(data[position:position + count * 4])
+            position += count * 4
+            return values
+
+        offsets = read_array(token_count + 1)
+        sentence_starts = read_array(sentence_count)
+        paragraph_starts = read_array(paragraph_count)
+        blob = data[position:position + blob_size]
+        if len(blob) != blob_size:
+            raise ValueError("Truncated cache entry")
+
+        if len(offsets) != token_count + 1 or offsets[-1] != blob_size:
+            raise ValueError("Token offsets mismatch")
+        blob.decode("utf-8")  # raises on a corrupt blob; tokens decode lazily after this
+        return Document.from_parts(blob, offsets, sentence_starts, paragraph_starts)
@@ -0,0 +1,595 @@
+# engine.py
+import threading
+import time
+from collections import deque, namedtuple
+from functools import partial
+
+from adaptive import AdaptivePace
+from document import Document
+from document_cache import content_hasher, file_fingerprint, key_for_text
+from lexicon import DifficultyModel, load_default_lexicon
+from loader import StreamingLoader
+from pacing import DeadlineScheduler
+from search import INDEX_BATCH, SearchIndex
+from schedule import ScheduleCompiler, compile_schedule
+from tokenizer import tokenize_paragraphs
+
+# Everything a view needs to draw one tick of playback. lateness is how far
+# past its deadline the reader produced the frame, created is its
+# time.perf_counter() timestamp; both feed the render instrumentation.
+# focus is the current chunk's (focus index, offset, width) when the engine
+# has a focus layout, else None.
+Frame = namedtuple("Frame", "prev_chunk current_chunk next_chunk progress "
+                            "seconds_remaining lateness created focus",
+                   defaults=(0.0, 0.0, None))
+
+DEFAULT_PUNCTUATION_DELAYS = {
+    '.': 2.0, '!': 2.0, '?': 2.0,
+    ',': 1.5, ';': 1.5, ':': 1.5,
+    '-': 1.2, '(': 1.2, ')': 1.2
+}
+
+# Playback states
+STOPPED, PLAYING, PAUSED = "stopped", "playing", "paused"
+
+
+class ReaderView:
+    """What ReadingEngine needs from a front end.
+
+    Both methods are called from the reader thread, so a GUI view must hand
+    the work over to its own main thread rather than draw directly.
+    """
+
+    def show_frame(self, frame):
+        pass
+
+    def reading_finished(self):
+        pass
+
+
+class ReadingEngine:
+    """Tokenizing, scheduling and playback, independent of any GUI toolkit.
+
+    The engine owns the document, its compiled schedule and the reader
+    thread. It reports what to show through a ReaderView and never touches
+    widgets, so it can be driven headless by benchmarks or a CLI.
+
+    Playback is a small state machine (stopped, playing, paused) guarded by
+    one Condition. Control calls change the state or queue a command and
+    wake the reader, which blocks on the Condition, or on the pacer's
+    interruptible wait, instead of polling: it reacts at once and uses no
+    CPU while paused. At most one reader thread exists at a time.
+    """
+
+    def __init__(self, view=None, document_cache=None, session_store=None,
+                 pacer=None, wpm=300, words_per_chunk=1, indexing=True):
+        self.view = view or ReaderView()
+        self.document_cache = document_cache
+        self.session_store = session_store
+        self.pacer = pacer or DeadlineScheduler()
+
+        # Reading configuration
+        self.text = ""
+        self.wpm = wpm
+        self.words_per_chunk = words_per_chunk
+        self.base_delay = 60 / self.wpm
+        self.punctuation_delays = dict(DEFAULT_PUNCTUATION_DELAYS)
+        self.adaptive = None  # AdaptivePace when adaptive speed is on
+        self.focus_layout = None  # orp.FocusLayout from a view that pins focus letters
+        self.difficulty = None  # DifficultyModel when frequency-aware timing is on
+        self.lexicon = None  # mapped on first use
+        self.state = STOPPED
+        self.reader = None  # thread running the current or last session
+
+        # Precompiled playback plan, rebuilt in the background on settings changes
+        self.document = Document()
+        self.schedule = None
+        self.schedule_compiler = ScheduleCompiler(self.on_schedule_ready)
+        # Guards the schedule, the playback state and the command queue;
+        # the reader waits on it for commands, resumes and streamed words
+        self.schedule_lock = threading.Condition()
+        self.commands = deque()  # (name, argument) for the reader, oldest first
+        self.current_word_index = 0
+        self.search_index = None  # SearchIndex over the current document
+        self.indexing = indexing  # build a SearchIndex for each document read
+
+        # Large files are streamed from disk instead of read up front
+        self.stream_path = None
+        self.stream_loader = None
+        self.stream_complete = True
+        self.stream_fingerprint = None
+        self.document_key = None  # content hash, or file fingerprint until known
+
+    # Settings
+
+    def set_wpm(self, wpm):
+        self.wpm = wpm
+        self.base_delay = 60 / self.wpm
+        if self.adaptive is not None:
+            self.adaptive.target_wpm = wpm
+        self.recompile_schedule()
+        # The reader stretches the current wait to the new speed right away
+        self.wake_reader()
+
+    def set_adaptive(self, enabled):
+        """Turn adaptive speed on or off; the WPM setting becomes its target."""
+        self.adaptive = AdaptivePace(self.wpm) if enabled else None
+
+    def set_difficulty(self, enabled):
+        """Turn frequency-aware timing on or off; False if no lexicon can be read."""
+        if enabled and self.lexicon is None:
+            self.lexicon = load_default_lexicon()
+        self.difficulty = (DifficultyModel(self.lexicon)
+                           if enabled and self.lexicon is not None else None)
+        self.recompile_schedule()
+        return self.difficulty is not None
+
+    def report_render_cost(self, seconds):
+        """Called by the view with the time from a frame's creation until it was drawn."""
+        adaptive = self.adaptive
+        if adaptive is not None:
+            adaptive.report_render_cost(seconds)
+
+    def pace_factor(self, schedule):
+        """Multiplier for the schedule's compiled delays at the current speed.
+
+        Until a schedule recompiled for a new WPM setting arrives, the old
+        one is played scaled to the new speed.
+        """
+        adaptive = self.adaptive
+        if adaptive is not None:
+            return adaptive.factor or 1.0
+        return schedule.wpm / self.wpm
+
+    def set_words_per_chunk(self, words_per_chunk):
+        self.words_per_chunk = words_per_chunk
+        self.recompile_schedule()
+
+    def recompile_schedule(self):
+        """Rebuild the reading schedule in the background with current settings."""
+        if self.schedule is not None:
+            self.schedule_compiler.submit(self.document, self.wpm,
+                                          self.words_per_chunk,
+                                          self.punctuation_delays,
+                                          final=self.stream_complete,
+                                          focus_layout=self.focus_layout,
+                                          difficulty=self.difficulty)
+
+    def on_schedule_ready(self, schedule):
+        with self.schedule_lock:
+            # Ignore schedules compiled for a previous text
+            if schedule.words is self.document:
+                # Catch up with words streamed in while it was compiling
+                schedule.extend_to(len(self.document), final=self.stream_complete)
+                self.schedule = schedule
+                self.wake_reader()
+
+    # Playback control
+
+    @property
+    def running(self):
+        return self.state != STOPPED
+
+    @property
+    def paused(self):
+        return self.state == PAUSED
+
+    def wake_reader(self):
+        """Have the reader look at its state and commands now."""
+        with self.schedule_lock:
+            self.schedule_lock.notify_all()
+        self.pacer.interrupt()
+
+    def start(self, text=None, stream_path=None, background=True):
+        """Start reading text, or stream a file when stream_path is given.
+
+        Returns False if a reading session is already running, and raises
+        OSError if the file to stream can't be opened. A reader
+        still winding down from stop() is waited for first, so two never
+        run at once. With background=False the reader runs in the calling
+        thread and returns when playback ends.
+        """
+        with self.schedule_lock:
+            if self.state != STOPPED:
+                return False
+            previous = self.reader
+        if previous is not None and previous is not threading.current_thread():
+            # Already told to stop, so it exits at its next wake-up
+            previous.join()
+
+        document = Document()
+        loader = None
+        if stream_path is not None:
+            # Created before the state changes: a file that has gone away
+            # raises OSError here and leaves the engine stopped. Callbacks
+            # carry the document they load into, so a loader cancelled by
+            # stop() can't touch the next session's
+            loader = StreamingLoader(stream_path, tokenize_paragraphs,
+                                     partial(self.on_stream_words, document),
+                                     partial(self.on_stream_done, document),
+                                     hasher=content_hasher())
+
+        with self.schedule_lock:
+            if self.state != STOPPED:
+                return False
+            self.state = PLAYING
+            self.commands.clear()
+            self.current_word_index = 0
+            self.schedule = None
+            self.document = document
+            if loader is not None:
+                self.text = ""
+                self.stream_path = stream_path
+                self.stream_complete = False
+                self.stream_loader = loader
+            else:
+                self.text = text
+                self.stream_path = None
+                self.stream_complete = True
+                self.stream_loader = None
+            if background:
+                self.reader = threading.Thread(target=self.run)
+                self.reader.daemon = True
+            else:
+                self.reader = threading.current_thread()
+
+        if background:
+            self.reader.start()
+        else:
+            self.run()
+        return True
+
+    def pause(self):
+        with self.schedule_lock:
+            if self.state != PLAYING:
+                return
+            self.state = PAUSED
+        self.wake_reader()
+        self.flush_session()
+
+    def resume(self):
+        with self.schedule_lock:
+            if self.state != PAUSED:
+                return
+            self.state = PLAYING
+        self.wake_reader()
+
+    def stop(self):
+        with self.schedule_lock:
+            self.state = STOPPED
+            self.commands.clear()
+        self.wake_reader()
+        if self.stream_loader is not None:
+            self.stream_loader.cancel()
+        self.flush_session()
+
+    def close(self):
+        """Remember where we are before the application exits."""
+        if self.running and self.session_store is not None:
+            self.session_store.record_position(self.document_key, self.current_word_index)
+
+    def flush_session(self):
+        if self.session_store is not None:
+            self.session_store.request_flush()
+
+    @property
+    def load_error(self):
+        return self.stream_loader.error if self.stream_loader is not None else None
+
+    @property
+    def compile_error(self):
+        """Why the last settings change couldn't be applied, or None."""
+        return self.schedule_compiler.error
+
+    # Seeking
+
+    def seek_to_word(self, word_index):
+        """Jump playback to the chunk containing word_index, paused or not."""
+        with self.schedule_lock:
+            if self.state == STOPPED:
+                return
+            self.commands.append(("seek", word_index))
+        self.wake_reader()
+
+    def seek_fraction(self, fraction):
+        self.seek_to_word(int(min(1.0, max(0.0, fraction)) * self.total_words_estimate()))
+
+    def seek_sentences(self, count):
+        if self.running and not self.paused:
+            if count < 0 and self.adaptive is not None:
+                self.adaptive.rewound()
+            self.seek_to_word(self.document.seek_sentence(self.current_word_index, count))
+
+    def seek_paragraphs(self, count):
+        if self.running and not self.paused:
+            if count < 0 and self.adaptive is not None:
+                self.adaptive.rewound()
+            self.seek_to_word(self.document.seek_paragraph(self.current_word_index, count))
+
+    def seek_to_time(self, seconds):
+        schedule = self.schedule
+        if schedule is not None and len(schedule):
+            self.seek_to_word(schedule.chunk_starts[schedule.chunk_at_time(seconds)])
+
+    # Progress
+
+    def make_frame(self, schedule, chunk_index, lateness=0.0):
+        total_words = self.total_words_estimate()
+        return Frame(
+            *schedule.display(chunk_index),
+            progress=min(100, (schedule.chunk_starts[chunk_index] / total_words) * 100),
+            seconds_remaining=self.time_remaining_estimate(schedule, chunk_index),
+            lateness=lateness,
+            created=time.perf_counter(),
+            focus=schedule.focus(chunk_index))
+
+    def total_words_estimate(self):
+        if self.stream_loader is not None:
+            return max(1, self.stream_loader.estimated_total_words())
+        return max(1, len(self.document))
+
+    def time_remaining_estimate(self, schedule, chunk_index):
+        """Exact remaining time from the schedule's prefix sums.
+
+        While a file is still streaming in, words not yet compiled are
+        added at the average per-word delay seen so far.
+        """
+        remaining = schedule.remaining_time(chunk_index)
+        if not schedule.complete and schedule.compiled_words:
+            uncompiled = self.total_words_estimate() - schedule.compiled_words
+            if uncompiled > 0:
+                remaining += uncompiled * schedule.total_time / schedule.compiled_words
+        return remaining * self.pace_factor(schedule)
+
+    # Searching
+
+    def start_indexing(self):
+        """Index the current document for search on a background thread."""
+        if not self.indexing:
+            self.search_index = None
+            return
+        index = self.search_index = SearchIndex(self.document)
+        thread = threading.Thread(target=self.build_index, args=(index,))
+        thread.daemon = True
+        thread.start()
+
+    def build_index(self, index):
+        """Index the document a batch at a time, following a streaming load."""
+        document = index.document
+        while True:
+            with self.schedule_lock:
+                # Wait for streamed words; give up if reading stops first
+                while (index.size >= len(document) and not self.stream_complete
+                       and self.state != STOPPED and self.document is document):
+                    self.schedule_lock.wait()
+                if self.document is not document:
+                    return
+                available = len(document)
+                complete = self.stream_complete
+            if index.size < available:
+                index.add(index.size, min(available, index.size + INDEX_BATCH))
+            elif complete:
+                index.freeze()
+                return
+            else:
+                return
+
+    def search(self, query):
+        """Word positions where query occurs in the current document."""
+        index = self.search_index
+        return index.search(query) if index is not None else []
+
+    # Loading
+
+    def on_stream_words(self, document, words, paragraph_starts):
+        with self.schedule_lock:
+            if self.document is not document:
+                return  # from a loader whose session has ended
+            document.extend(words, paragraph_starts)
+            self.schedule.extend_to(len(document), final=False)
+            self.schedule_lock.notify_all()
+
+    def on_stream_done(self, document):
+        with self.schedule_lock:
+            if self.document is not document:
+                return
+            self.stream_complete = True
+            self.schedule.extend_to(len(document), final=True)
+            self.schedule_lock.notify_all()
+            loader = self.stream_loader
+            fingerprint = self.stream_fingerprint
+        if loader is not None and loader.completed:
+            if self.document_cache is not None:
+                self.document_cache.store_async(loader.content_key, document, fingerprint)
+            # From now on remember the position by content hash
+            self.document_key = loader.content_key
+
+    def load_cached_document(self):
+        """Return a ready Document for the text about to be read, or None.
+
+        None means a file has to be streamed. On a miss for pasted text the
+        document is built here and cached in the background; a streamed
+        file is cached when its load completes.
+        """
+        cache = self.document_cache
+        if self.stream_loader is not None:
+            try:
+                self.stream_fingerprint = file_fingerprint(self.stream_path)
+            except OSError:
+                self.stream_fingerprint = None
+                return None
+            key = cache.key_for_file(self.stream_fingerprint) if cache else None
+            self.document_key = key or self.stream_fingerprint
+            return cache.load(key) if key else None
+
+        key = key_for_text(self.text)
+        self.document_key = key
+        self.stream_fingerprint = None
+        document = cache.load(key) if cache else None
+        if document is None:
+            document = Document.from_text(self.text)
+            if cache is not None:
+                cache.store_async(key, document)
+        return document
+
+    def resume_chunk_index(self):
+        """Chunk to start from, restoring the position saved for this document."""
+        if self.session_store is None:
+            return 0
+        word_index = self.session_store.get_position(self.document_key,
+                                                     self.stream_fingerprint)
+        if not word_index:
+            return 0
+        with self.schedule_lock:
+            # A streamed file may not have reached the saved position yet
+            while (self.state != STOPPED and not self.schedule.complete
+                   and self.schedule.compiled_words <= word_index):
+                self.schedule_lock.wait()
+            return self.schedule.chunk_at_word(word_index)
+
+    def record_position(self, word_index):
+        if self.session_store is not None:
+            self.session_store.record_position(self.document_key, word_index)
+
+    # Reader loop
+
+    def apply_commands(self, schedule, chunk_index):
+        """Adopt a recompiled schedule and run queued seeks.
+
+        Called by the reader with schedule_lock held; returns the schedule
+        and chunk index to continue from. A seek past the words compiled so
+        far stays queued until the stream reaches it.
+        """
+        if self.schedule is not schedule:
+            # Recompiled for new settings: carry on from the next unread word
+            next_word = (schedule.chunk_starts[chunk_index] if chunk_index < len(schedule)
+                         else schedule.compiled_words)
+            if self.adaptive is not None:
+                self.adaptive.schedule_changed(schedule.wpm, self.schedule.wpm)
+            schedule = self.schedule
+            chunk_index = (schedule.chunk_at_word(next_word)
+                           if next_word < schedule.compiled_words else len(schedule))
+
+        while self.commands:
+            name, word_index = self.commands[0]
+            if (name == "seek" and not schedule.complete
+                    and word_index >= schedule.compiled_words):
+                # A streamed file hasn't reached the target yet; keep the seek
+                # queued and hold the reader until those words are compiled
+                chunk_index = len(schedule)
+                break
+            self.commands.popleft()
+            if name == "seek" and len(schedule):
+                chunk_index = schedule.chunk_at_word(word_index)
+                self.current_word_index = schedule.chunk_starts[chunk_index]
+                if self.state == PAUSED:
+                    # Nothing else will draw it until playback resumes
+                    self.view.show_frame(self.make_frame(schedule, chunk_index))
+                else:
+                    # Restart timing from the position the user jumped to
+                    self.pacer.rebase()
+        return schedule, chunk_index
+
+    def run(self):
+        document = self.load_cached_document()
+        with self.schedule_lock:
+            if self.state == STOPPED:
+                return
+            if document is None:
+                self.schedule = compile_schedule(self.document, self.wpm,
+                                                 self.words_per_chunk,
+                                                 self.punctuation_delays,
+                                                 final=False,
+                                                 focus_layout=self.focus_layout,
+                                                 difficulty=self.difficulty)
+            else:
+                # Already tokenized, whether it was pasted or a cached file
+                self.stream_loader = None
+                self.stream_complete = True
+                self.document = document
+        if document is None:
+            self.stream_loader.start()
+        else:
+            self.schedule = compile_schedule(self.document, self.wpm,
+                                             self.words_per_chunk,
+                                             self.punctuation_delays,
+                                             focus_layout=self.focus_layout,
+                                             difficulty=self.difficulty)
+        schedule = self.schedule
+        self.start_indexing()
+        chunk_index = self.resume_chunk_index()
+        pacer = self.pacer
+        adaptive = self.adaptive
+        if adaptive is not None:
+            adaptive.reset()
+        pacer.reset_stats()
+        pacer.start()
+        paced_wpm = self.wpm  # speed the pending deadline was set for
+        idle = False  # pacer stopped for a pause
+        finished = False
+
+        while True:
+            with self.schedule_lock:
+                schedule, chunk_index = self.apply_commands(schedule, chunk_index)
+                if self.state == STOPPED:
+                    break
+                if self.state == PAUSED:
+                    if not idle:
+                        pacer.stop()
+                        idle = True
+                    # Sleep until resume, stop or a seek; no polling
+                    self.schedule_lock.wait()
+                    continue
+                if idle:
+                    pacer.start()
+                    idle = False
+                if self.wpm != paced_wpm:
+                    if self.adaptive is None:
+                        pacer.rescale(paced_wpm / self.wpm)
+                    paced_wpm = self.wpm
+                if chunk_index >= len(schedule) and not schedule.complete:
+                    # Caught up with a streaming load; wait for more words
+                    self.schedule_lock.wait()
+                    continue
+
+            lateness = pacer.wait()
+            if lateness is None:
+                # Woken for a command before the frame was due
+                continue
+            if chunk_index >= len(schedule):
+                # The last chunk has had its full time on screen
+                finished = True
+                break
+
+            # Drop frames whose whole display slot has already gone by
+            scale = self.pace_factor(schedule)
+            while (chunk_index + 1 < len(schedule)
+                   and pacer.is_overdue(schedule.delays[chunk_index] * scale)):
+                pacer.skip(schedule.delays[chunk_index] * scale)
+                chunk_index += 1
+
+            self.current_word_index = schedule.chunk_starts[chunk_index]
+            self.view.show_frame(self.make_frame(schedule, chunk_index, lateness))
+            self.record_position(self.current_word_index)
+
+            # Speed changes scale only the chunk about to play, so they
+            # never have to wait for the schedule to be recompiled
+            delay = schedule.delays[chunk_index]
+            adaptive = self.adaptive
+            if adaptive is not None:
+                delay *= adaptive.delay_factor(schedule, chunk_index, lateness)
+            else:
+                delay *= scale
+            pacer.advance(delay, schedule.chunk_word_count(chunk_index), lateness)
+            chunk_index += 1
+
+        if finished:
+            # Start from the beginning next time
+            self.record_position(0)
+        pacer.stop()
+
+        with self.schedule_lock:
+            finished = finished and self.state != STOPPED
+            self.state = STOPPED
+        if finished:
+            self.view.reading_finished()
@@ -0,0 +1,129 @@
+# instrumentation.py
+import json
+import time
+from array import array
+
+# Per-frame measurements, all in seconds except tcl_calls
+FIELDS = ("start", "render", "display", "progress", "labels",
+          "lateness", "queue_delay", "tcl_calls")
+
+
+class TclCallCounter:
+    """Stands in for a widget's tkapp and counts the Tcl commands it runs.
+
+    Tkinter widgets issue every command through self.tk.call, so giving a
+    widget this object as its `tk` counts its traffic with one extra
+    Python call per command. Everything else is passed straight through.
+    """
+
+    def __init__(self, tk):
+        self._tk = tk
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tk.call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._tk, name)
+
+    def attach(self, *widgets):
+        for widget in widgets:
+            widget.tk = self
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class FrameProfiler:
+    """Fixed-size ring buffer of per-frame render timings.
+
+    Recording a frame is a handful of array stores, so it stays on all the
+    time; the buffer keeps the most recent `capacity` frames for the
+    overlay and for export.
+    """
+
+    def __init__(self, capacity=4096, clock=time.perf_counter):
+        self.capacity = capacity
+        self.clock = clock
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in FIELDS}
+        self.count = 0  # frames recorded since the last reset
+
+    def reset(self):
+        self.count = 0
+
+    def record(self, start, render, display, progress, labels, lateness,
+               queue_delay, tcl_calls):
+        index = self.count % self.capacity
+        columns = self.columns
+        columns["start"][index] = start
+        columns["render"][index] = render
+        columns["display"][index] = display
+        columns["progress"][index] = progress
+        columns["labels"][index] = labels
+        columns["lateness"][index] = lateness
+        columns["queue_delay"][index] = queue_delay
+        columns["tcl_calls"][index] = tcl_calls
+        self.count += 1
+
+    def column(self, name, last=None):
+        """Values of one field, oldest first, for at most the `last` frames."""
+        size = min(self.count, self.capacity)
+        if last is not None:
+            size = min(size, last)
+        end = self.count % self.capacity
+        values = self.columns[name]
+        if size <= end:
+            return values[end - size:end]
+        return values[self.capacity - (size - end):] + values[:end]
+
+    def samples(self):
+        """Recorded frames, oldest first, as dicts."""
+        columns = [self.column(name) for name in FIELDS]
+        return [dict(zip(FIELDS, values)) for values in zip(*columns)]
+
+    def summary(self, window=240):
+        """Frame rate and percentiles over the last `window` frames."""
+        starts = self.column("start", window)
+        renders = sorted(self.column("render", window))
+        lateness = sorted(self.column("lateness", window))
+        calls = self.column("tcl_calls", window)
+        span = starts[-1] - starts[0] if len(starts) > 1 else 0.0
+        return {
+            "frames": self.count,
+            "fps": (len(starts) - 1) / span if span > 0 else 0.0,
+            "render_p50_ms": percentile(renders, 0.50) * 1000,
+            "render_p99_ms": percentile(renders, 0.99) * 1000,
+            "lateness_p99_ms": percentile(lateness, 0.99) * 1000,
+            "tcl_calls_per_frame": sum(calls) / len(calls) if calls else 0.0,
+        }
+
+    def export_json(self, path, extra=None):
+        data = {"fields": FIELDS, "summary": self.summary(self.capacity),
+                "frames": self.samples()}
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    def export_chrome_trace(self, path):
+        """Write the frames in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        events = []
+        for sample in self.samples():
+            ts = sample["start"] * 1e6
+            events.append({"name": "render_frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": ts, "dur": sample["render"] * 1e6,
+                           "args": {"tcl_calls": int(sample["tcl_calls"])}})
+            offset = ts
+            for name in ("display", "progress", "labels"):
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": offset, "dur": sample[name] * 1e6})
+                offset += sample[name] * 1e6
+            events.append({"name": "timing", "ph": "C", "pid": 1, "ts": ts,
+                           "args": {"lateness_ms": sample["lateness"] * 1000,
+                                    "queue_delay_ms": sample["queue_delay"] * 1000}})
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
@@ -0,0 +1,175 @@
+# lexicon.py
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import repeat
+
+from loader import iter_text_chunks
+from tokenizer import tokenize
+
+# File layout: header, byte offsets of the words in the blob (count + 1),
+# the rank of each word, then the words sorted by their UTF-8 bytes and
+# concatenated. Arrays are uint32 in native byte order, so the file is
+# mapped and searched in place without building a dict of strings.
+MAGIC = b"FFLX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("=4sHBxI")
+
+def default_user_lexicon_path():
+    """Where `speed_reader.py lexicon` writes a lexicon built from your own books."""
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "focusflow", "lexicon.bin")
+
+
+def build_lexicon(ranked_words, path):
+    """Write words, most frequent first, as a lexicon file at path."""
+    ranks = {}
+    for rank, word in enumerate(ranked_words, 1):
+        ranks.setdefault(word.encode("utf-8"), rank)
+    words = sorted(ranks)
+    offsets = array('I', [0])
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "little", len(words)))
+        offsets.tofile(file)
+        array('I', map(ranks.__getitem__, words)).tofile(file)
+        file.write(b"".join(words))
+    os.replace(temp_path, path)
+
+
+def count_words(path):
+    """Lowercased word counts for one text file; runs in a worker process."""
+    counts = Counter()
+    try:
+        for text, _ in iter_text_chunks(path):
+            counts.update(word for word in map(str.lower, tokenize(text)) if word.isalpha())
+    except (OSError, ValueError) as e:
+        return path, None, str(e)
+    return path, counts, None
+
+
+class SortedWords:
+    """The lexicon's words as a read-only sequence of bytes, for bisect."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]])
+
+
+class Lexicon:
+    """Frequency ranks from a memory-mapped lexicon file.
+
+    Opening only maps the file and checks its header; a lookup is a binary
+    search over the mapped, sorted words, and batches of words are looked
+    up in sorted order so each search starts where the last one ended.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, little_endian, count = HEADER.unpack_from(self._map, 0)
+            if (magic != MAGIC or version != FORMAT_VERSION
+                    or bool(little_endian) != (sys.byteorder == "little")):
+                raise ValueError("Incompatible lexicon file")
+            ranks_at = HEADER.size + (count + 1) * 4
+            blob_at = ranks_at + count * 4
+            blob_size, = struct.unpack_from("=I", self._map, ranks_at - 4)
+            if len(self._map) != blob_at + blob_size:
+                raise ValueError("Truncated lexicon file")
+        except (ValueError, struct.error):
+            self._map.close()
+            raise ValueError("Invalid lexicon file")
+
+        view = memoryview(self._map)
+        self.ranks = view[ranks_at:blob_at].cast('I')
+        self.words = SortedWords(view[HEADER.size:ranks_at].cast('I'), view[blob_at:])
+
+    def __len__(self):
+        return len(self.words)
+
+    def rank(self, word):
+        """Frequency rank of word (1 is the most common), or None if unlisted."""
+        return self.ranks_for([word]).get(word)
+
+    def ranks_for(self, words):
+        """Ranks of the listed words among `words`, as {word: rank}."""
+        found = {}
+        position = 0
+        sorted_words = self.words
+        count = len(sorted_words)
+        for word, key in sorted((word, word.encode("utf-8")) for word in set(words)):
+            # Sorting str and UTF-8 bytes give the same order, so the search
+            # never has to look behind the previous match
+            position = bisect_left(sorted_words, key, position)
+            if position < count and sorted_words[position] == key:
+                found[word] = self.ranks[position]
+        return found
+
+
+def load_default_lexicon():
+    """The lexicon built by `speed_reader.py lexicon`, or None if there isn't one.
+
+    Nothing is bundled: ranking rare words needs counts over tens of
+    thousands of words, which only a real corpus gives, and a short list
+    of common words would leave every other word equally "rare".
+    """
+    try:
+        return Lexicon(default_user_lexicon_path())
+    except (OSError, ValueError):
+        return None
+
+
+class DifficultyModel:
+    """Gives rare words more time and common words less, by frequency rank.
+
+    A word's delay multiplier rises with the logarithm of its rank, from
+    `easiest` for the common_rank most frequent words to `hardest` for
+    words past the end of the lexicon or not in it at all. Multipliers are
+    then normalized over each batch so the words average 1.0: time moves
+    from common words to rare ones, and the WPM setting still holds.
+    Punctuation and numbers are left alone.
+    """
+
+    def __init__(self, lexicon, common_rank=100, easiest=0.85, hardest=1.35):
+        self.lexicon = lexicon
+        self.common_rank = common_rank
+        self.easiest = easiest
+        self.hardest = hardest
+        self.rare_rank = max(len(lexicon), common_rank * 10)
+
+    def factor(self, rank):
+        if rank is None:
+            return self.hardest
+        span = math.log(self.rare_rank / self.common_rank)
+        rarity = math.log(max(rank, self.common_rank) / self.common_rank) / span
+        return self.easiest + (self.hardest - self.easiest) * min(1.0, rarity)
+
+    def factors(self, tokens):
+        """Delay multiplier for every token of a batch, as an array('d')."""
+        lowered = list(map(str.lower, tokens))
+        counts = Counter(lowered)
+        words = [word for word in counts if word.isalpha()]
+        ranks = self.lexicon.ranks_for(words)
+        factor_of = {word: self.factor(ranks.get(word)) for word in words}
+
+        total = sum(counts[word] for word in words)
+        if total:
+            mean = sum(counts[word] * factor for word, factor in factor_of.items()) / total
+            factor_of = {word: factor / mean for word, factor in factor_of.items()}
+        return array('d', map(factor_of.get, lowered, repeat(1.0)))
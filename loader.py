@@ -0,0 +1,327 @@
+# loader.py
+import codecs
+import os
+import threading
+import zipfile
+
+from markup import TextExtractor, declared_encoding, epub_chapters
+
+# Files larger than this are streamed instead of loaded into the text box
+STREAMING_THRESHOLD = 2 * 1024 * 1024
+
+# Characters of a streamed file shown in the text box
+PREVIEW_CHARS = 20000
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# The first read is kept small so playback can start right away
+FIRST_CHUNK_SIZE = 64 * 1024
+
+
+# Files read as markup rather than plain text
+EPUB_EXTENSIONS = (".epub",)
+HTML_EXTENSIONS = (".html", ".htm", ".xhtml")
+READABLE_EXTENSIONS = (".txt",) + EPUB_EXTENSIONS + HTML_EXTENSIONS
+
+# For file dialogs
+READABLE_FILE_TYPES = [("Books and text", " ".join("*" + ext for ext in READABLE_EXTENSIONS)),
+                       ("Text Files", "*.txt"), ("All Files", "*.*")]
+
+# Byte order marks, longest first since UTF-32 LE starts like UTF-16 LE
+BOMS = ((codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+        (codecs.BOM_UTF8, "utf-8-sig"),
+        (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def is_epub(file_path):
+    return file_path.lower().endswith(EPUB_EXTENSIONS)
+
+
+def is_html(file_path):
+    return file_path.lower().endswith(HTML_EXTENSIONS)
+
+
+def should_stream(file_path):
+    """True if a file is read in the background rather than into the text box.
+
+    An EPUB always is: it is compressed, so its size says little about its
+    length, and the first chapter can be read while the rest is unpacked.
+    """
+    return is_epub(file_path) or os.path.getsize(file_path) > STREAMING_THRESHOLD
+
+
+class DetectingDecoder:
+    """Incremental decoder that works out a text file's encoding as it reads.
+
+    A byte order mark settles it at once. Otherwise the text is taken to
+    be UTF-8 until a byte proves it isn't: if everything before that byte
+    was ASCII the text is read as the fallback, Windows-1252 by default,
+    which is what most non-UTF-8 books are; after real UTF-8 text a bad
+    byte is just replaced. Nothing is read twice, so detection costs no
+    more than decoding.
+    """
+
+    def __init__(self, fallback="cp1252"):
+        self.fallback = fallback
+        self.encoding = None  # the codec in use, once bytes have been seen
+        self._decoder = None
+        self._head = b""  # bytes held back until a BOM can be ruled out
+        self._strict = False  # still checking that the text is UTF-8
+        self._ascii = True  # nothing but ASCII decoded so far
+
+    def _choose(self, head):
+        for bom, encoding in BOMS:
+            if head.startswith(bom):
+                self._use(encoding)
+                return
+        self._use("utf-8", strict=True)
+
+    def _use(self, encoding, strict=False):
+        self.encoding = encoding
+        self._strict = strict
+        errors = "strict" if strict else "replace"
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+
+    def decode(self, data, final=False):
+        if self._decoder is None:
+            self._head += data
+            if len(self._head) < 4 and not final:
+                return ""
+            data, self._head = self._head, b""
+            self._choose(data)
+        if not self._strict:
+            return self._decoder.decode(data, final)
+
+        pending = self._decoder.getstate()[0]
+        try:
+            text = self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            # Not UTF-8 after all. The bytes before the bad one decoded
+            # fine; if any were non-ASCII the file is UTF-8 with a bad byte
+            data = pending + data
+            valid = data[:e.start]
+            if self._ascii and valid.isascii():
+                self._use(self.fallback)
+                return self._decoder.decode(data, final)
+            self._use("utf-8")
+            return valid.decode("utf-8") + self._decoder.decode(data[e.start:], final)
+        if self._ascii and not text.isascii():
+            self._ascii = False
+        return text
+
+
+def make_decoder(encoding=None):
+    """An incremental decoder for encoding, or one that detects it if None."""
+    if encoding is not None:
+        try:
+            name = codecs.lookup(encoding).name
+        except LookupError:
+            name = "utf-8"
+        if name in ("ascii", "iso8859-1"):
+            # As browsers do: pages labelled Latin-1 are nearly always Windows-1252
+            name = "cp1252"
+        if name != "utf-8":
+            return codecs.getincrementaldecoder(name)(errors="replace")
+    # A declared UTF-8 is checked too; mislabelled files are common
+    return DetectingDecoder()
+
+
+def read_pieces(file, chunk_size, hasher=None):
+    """Yield (bytes, bytes_read) reads of an open binary file, ending with b""."""
+    size = min(chunk_size, FIRST_CHUNK_SIZE)
+    bytes_read = 0
+    while True:
+        data = file.read(size)
+        size = chunk_size
+        bytes_read += len(data)
+        if hasher is not None:
+            hasher.update(data)
+        yield data, bytes_read
+        if not data:
+            return
+
+
+def iter_plain_text(file_path, chunk_size, encoding=None, hasher=None):
+    decoder = make_decoder(encoding)
+    with open(file_path, "rb") as file:
+        for data, bytes_read in read_pieces(file, chunk_size, hasher):
+            yield decoder.decode(data, final=not data), bytes_read
+
+
+def iter_html_text(file, chunk_size, encoding=None, hasher=None):
+    """Yield (text, bytes_read) from an open HTML file, parsed as it is read."""
+    extractor = TextExtractor()
+    decoder = None
+    for data, bytes_read in read_pieces(file, chunk_size, hasher):
+        if decoder is None:
+            decoder = make_decoder(encoding or declared_encoding(data))
+        extractor.feed(decoder.decode(data, final=not data))
+        if not data:
+            extractor.close()
+        yield extractor.take(), bytes_read
+
+
+def iter_html_file(file_path, chunk_size, encoding=None, hasher=None):
+    with open(file_path, "rb") as file:
+        yield from iter_html_text(file, chunk_size, encoding, hasher)
+
+
+def iter_epub_text(file_path, chunk_size, hasher=None):
+    """Yield (text, bytes_read) from an EPUB, one chapter after another.
+
+    Chapters are inflated and parsed a piece at a time, so the first words
+    are ready as soon as the start of the first chapter is. bytes_read
+    counts compressed bytes, to compare with the size of the file.
+    """
+    try:
+        book = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a valid EPUB file: {e}")
+    with book:
+        done = 0
+        for name in epub_chapters(book):
+            info = book.getinfo(name)
+            ratio = info.compress_size / max(1, info.file_size)
+            with book.open(info) as member:
+                for text, bytes_read in iter_html_text(member, chunk_size, hasher=hasher):
+                    yield text, done + int(bytes_read * ratio)
+            done += info.compress_size
+            # Each chapter starts a new paragraph
+            yield "\n\n", done
+
+
+def iter_text_chunks(file_path, chunk_size=READ_CHUNK_SIZE, encoding=None,
+                     hasher=None):
+    """Yield (text, bytes_read) pieces of a file, decoded incrementally.
+
+    EPUB and HTML files yield their readable text, with a blank line
+    between paragraphs; other files are read as plain text, in the given
+    encoding or else one detected on the way. Each piece ends where a run
+    of whitespace begins, so no word or paragraph break is ever split
+    between two pieces. If a hashlib object is given, the raw bytes (for
+    an EPUB, its chapters' inflated bytes) are fed to it along the way.
+    """
+    if is_epub(file_path):
+        pieces = iter_epub_text(file_path, chunk_size, hasher)
+    elif is_html(file_path):
+        pieces = iter_html_file(file_path, chunk_size, encoding, hasher)
+    else:
+        pieces = iter_plain_text(file_path, chunk_size, encoding, hasher)
+    yield from whole_words(pieces)
+
+
+def whole_words(pieces):
+    """Rejoin (text, bytes_read) pieces so that each one ends before whitespace."""
+    carry = ""
+    bytes_read = 0
+    for text, bytes_read in pieces:
+        text = carry + text
+        # Hold back a trailing partial word, and the whitespace before it,
+        # so a paragraph break is never split between two pieces
+        cut = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"))
+        while cut > 0 and text[cut - 1].isspace():
+            cut -= 1
+        if cut <= 0:
+            carry = text
+            continue
+        carry = text[cut:]
+        yield text[:cut], bytes_read
+    if carry:
+        yield carry, bytes_read
+
+
+def read_text(file_path, encoding=None):
+    """The whole readable text of a file, as iter_text_chunks decodes it."""
+    return "".join(text for text, _ in iter_text_chunks(file_path, encoding=encoding))
+
+
+def read_preview(file_path, limit=PREVIEW_CHARS, encoding=None):
+    """Return the first `limit` characters of a file without reading the rest."""
+    parts = []
+    length = 0
+    for text, _ in iter_text_chunks(file_path, FIRST_CHUNK_SIZE, encoding):
+        parts.append(text)
+        length += len(text)
+        if length >= limit:
+            break
+    return "".join(parts)[:limit]
+
+
+def iter_word_batches(file_path, tokenize, chunk_size=READ_CHUNK_SIZE,
+                      encoding=None, hasher=None):
+    """Lazily tokenize a file, yielding (words, paragraph_starts, bytes_read).
+
+    tokenize is tokenizer.tokenize_paragraphs or a function like it.
+    """
+    for text, bytes_read in iter_text_chunks(file_path, chunk_size, encoding, hasher):
+        words, paragraph_starts = tokenize(text)
+        if words:
+            yield words, paragraph_starts, bytes_read
+
+
+class StreamingLoader:
+    """Tokenizes a large file on a background thread.
+
+    Each batch of words and its paragraph offsets is handed to on_words as
+    soon as it is ready, so playback can start while the rest of the file
+    is still being read. on_done is called once the whole file has been
+    processed or the load was cancelled. Given a hasher, the file's content
+    hash is available from content_key once the whole file has been read.
+    """
+
+    def __init__(self, file_path, tokenize, on_words, on_done,
+                 chunk_size=READ_CHUNK_SIZE, hasher=None):
+        self.file_path = file_path
+        self.tokenize = tokenize
+        self.on_words = on_words
+        self.on_done = on_done
+        self.chunk_size = chunk_size
+        self.hasher = hasher
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.words_loaded = 0
+        self.error = None
+        self.done = threading.Event()
+        self._cancelled = threading.Event()
+
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def completed(self):
+        """True once the whole file was read without error or cancellation."""
+        return (self.done.is_set() and self.error is None
+                and not self._cancelled.is_set())
+
+    @property
+    def content_key(self):
+        if self.hasher is None or not self.completed:
+            return None
+        return self.hasher.hexdigest()
+
+    def estimated_total_words(self):
+        """Extrapolate the document length from the fraction read so far."""
+        if self.done.is_set() or not self.bytes_read:
+            return self.words_loaded
+        return int(self.words_loaded * self.total_bytes / self.bytes_read)
+
+    def _run(self):
+        try:
+            for words, paragraph_starts, bytes_read in iter_word_batches(
+                    self.file_path, self.tokenize, self.chunk_size,
+                    hasher=self.hasher):
+                if self._cancelled.is_set():
+                    break
+                self.words_loaded += len(words)
+                self.bytes_read = bytes_read
+                self.on_words(words, paragraph_starts)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+            self.on_done()
@@ -0,0 +1,106 @@
+# markup.py
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+# Tags that start a new paragraph; text inside them is separated by a blank line
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "td", "th", "tr", "ul",
+])
+
+# Tags whose content is never read
+SKIPPED_TAGS = frozenset(["head", "noscript", "script", "style", "svg", "template", "title"])
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# A charset named in an XML declaration or a <meta> tag
+CHARSET_RE = re.compile(rb"""(?:encoding|charset)\s*=\s*["']?([A-Za-z0-9_.:-]+)""", re.I)
+
+CONTAINER_PATH = "META-INF/container.xml"
+CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+OPF_NS = "{http://www.idpf.org/2007/opf}"
+CHAPTER_TYPES = frozenset(["application/xhtml+xml", "text/html"])
+
+
+def declared_encoding(head):
+    """The charset an HTML or XHTML file declares in its first bytes, or None."""
+    match = CHARSET_RE.search(head[:1024])
+    return match.group(1).decode("ascii").lower() if match else None
+
+
+class TextExtractor(HTMLParser):
+    """Readable text of an HTML document, fed a piece at a time.
+
+    Runs of whitespace collapse to one space and block elements end in a
+    blank line, so tokenizer.tokenize_paragraphs sees the page's
+    paragraphs. Text is collected until take() is called.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skipping = 0  # depth inside skipped tags
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n\n")
+        elif tag == "br":
+            self._parts.append(" ")
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/>, <hr/> and the like; a self-closed skipped tag has no content
+        if tag not in SKIPPED_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._parts.append(WHITESPACE_RE.sub(" ", data))
+
+    def take(self):
+        """Return the text parsed since the last call."""
+        text = "".join(self._parts)
+        self._parts = []
+        return text
+
+
+def epub_chapters(book):
+    """Names of an EPUB's content documents in reading order.
+
+    book is an open zipfile.ZipFile. The spine of the package document is
+    followed when there is one; otherwise every HTML member is read in
+    name order.
+    """
+    names = set(book.namelist())
+    try:
+        container = ET.fromstring(book.read(CONTAINER_PATH))
+        rootfile = container.find(f".//{CONTAINER_NS}rootfile").get("full-path")
+        package = ET.fromstring(book.read(rootfile))
+    except (KeyError, AttributeError, ET.ParseError):
+        return sorted(name for name in names
+                      if name.lower().endswith((".xhtml", ".html", ".htm")))
+
+    base = posixpath.dirname(rootfile)
+    manifest = {}
+    for item in package.iter(f"{OPF_NS}item"):
+        if item.get("media-type") in CHAPTER_TYPES and item.get("href"):
+            href = unquote(item.get("href").split("#")[0])
+            manifest[item.get("id")] = posixpath.normpath(posixpath.join(base, href))
+    chapters = []
+    for itemref in package.iter(f"{OPF_NS}itemref"):
+        name = manifest.get(itemref.get("idref"))
+        if name in names and name not in chapters:
+            chapters.append(name)
+    return chapters
@@ -0,0 +1,100 @@
+# orp.py
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+
+# Characters whose widths are measured up front: printable ASCII and Latin-1
+# plus Latin Extended-A, which covers most European text
+LATIN_CHARS = "".join(map(chr, range(0x20, 0x7f))) + "".join(map(chr, range(0xa0, 0x180)))
+
+
+def focus_index(word):
+    """Index of the letter the eye should fixate on: the optimal recognition point.
+
+    Slightly left of center, moving right more slowly than the word grows.
+    """
+    length = len(word)
+    if length <= 1:
+        return 0
+    if length <= 5:
+        return 1
+    if length <= 9:
+        return 2
+    if length <= 13:
+        return 3
+    return 4
+
+
+class GlyphWidths(dict):
+    """Advance width of each character at one font size; unknown characters
+    get the fallback width (roughly an em, which suits CJK text)."""
+
+    def __init__(self, widths, fallback):
+        super().__init__(widths)
+        self.fallback = fallback
+
+    def __missing__(self, char):
+        return self.fallback
+
+
+class FocusLayout:
+    """Where to pin each display string so its focus letter stays put.
+
+    For a string it gives (focus index, offset, width): the offset is the
+    distance in pixels from the string's left edge to the center of its
+    focus letter, at the reference font size the glyph widths were taken
+    at. Widths are summed from per-character advances, so nothing here
+    touches Tk and schedules can be laid out on a compile thread. Results
+    for single words are kept in an LRU cache of maxsize words, so common
+    words cost a dict lookup and a large vocabulary can't grow the cache
+    from book to book. The cache is shared by the compile and loader
+    threads, so it is locked.
+    """
+
+    def __init__(self, glyph_widths, size, maxsize=8192):
+        self.glyph_widths = glyph_widths
+        self.size = size
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def text_width(self, text):
+        return sum(map(self.glyph_widths.__getitem__, text))
+
+    def measure(self, text):
+        # In a multi-word chunk the longest word carries the focus
+        start = 0
+        word = text
+        if " " in text:
+            word = ""
+            position = 0
+            for part in text.split(" "):
+                if len(part) > len(word):
+                    start, word = position, part
+                position += len(part) + 1
+        index = start + focus_index(word)
+        if index >= len(text):
+            return 0, 0.0, 0.0
+        offset = self.text_width(text[:index]) + self.glyph_widths[text[index]] / 2
+        return index, offset, self.text_width(text)
+
+    def cached(self, word):
+        cache = self._cache
+        with self._lock:
+            layout = cache.get(word)
+            if layout is not None:
+                cache.move_to_end(word)
+                return layout
+        layout = self.measure(word)
+        with self._lock:
+            cache[word] = layout
+            if len(cache) > self.maxsize:
+                cache.popitem(last=False)
+        return layout
+
+    def extend(self, texts, indices, offsets, widths, cache=True):
+        """Append the layout of each text to the three arrays."""
+        layouts = list(map(self.cached if cache else self.measure, texts))
+        indices.extend(map(itemgetter(0), layouts))
+        offsets.extend(map(itemgetter(1), layouts))
+        widths.extend(map(itemgetter(2), layouts))
@@ -0,0 +1,121 @@
+# pacing.py
+import threading
+import time
+from collections import deque
+
+
+class DeadlineScheduler:
+    """Paces playback against absolute monotonic deadlines.
+
+    Each frame is due at the previous deadline plus its delay, not at "now
+    plus delay", so time spent rendering never accumulates into drift.
+    Small lateness is recovered by shortening the following waits; frames
+    whose whole slot has already passed can be skipped; a stall longer than
+    max_lateness (a pause, a suspended laptop) rebases instead of bursting.
+
+    By default the wait sleeps on an Event, so interrupt() can wake it
+    immediately when the reader has a command to handle.
+    """
+
+    def __init__(self, max_lateness=0.5, history=1024,
+                 clock=time.perf_counter, sleep=None):
+        self.max_lateness = max_lateness
+        self.clock = clock
+        self._wake = threading.Event()
+        self.sleep = sleep or self._wake.wait
+        self.lateness = deque(maxlen=history)
+        self.deadline = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.lateness.clear()
+        self.words_shown = 0
+        self.frames_shown = 0
+        self.frames_skipped = 0
+        self.active_time = 0.0
+        self._segment_start = None
+
+    def start(self):
+        """Begin a playback segment; the first frame is due immediately."""
+        self.deadline = self.clock()
+        self._segment_start = self.deadline
+
+    def stop(self):
+        """End a playback segment (pause or stop) so idle time isn't counted."""
+        if self._segment_start is not None:
+            self.active_time += self.clock() - self._segment_start
+            self._segment_start = None
+
+    def rebase(self):
+        self.stop()
+        self.start()
+
+    def interrupt(self):
+        """Cut the current or next wait short; safe to call from any thread."""
+        self._wake.set()
+
+    def wait(self):
+        """Sleep until the current deadline and return the lateness in seconds.
+
+        Returns None instead if interrupt() was called first; the deadline
+        is unchanged, so calling wait again resumes the same wait.
+        """
+        remaining = self.deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+            if self._wake.is_set():
+                self._wake.clear()
+                return None
+        lateness = self.clock() - self.deadline
+        if lateness > self.max_lateness:
+            # Too far behind to catch up smoothly; start over from now
+            self.deadline += lateness
+            lateness = 0.0
+        return max(0.0, lateness)
+
+    def rescale(self, factor):
+        """Stretch what is left of the current wait, e.g. after a speed change."""
+        remaining = self.deadline - self.clock()
+        if remaining > 0:
+            self.deadline += remaining * (factor - 1)
+
+    def is_overdue(self, delay):
+        """True when a frame of the given delay would already be over."""
+        return self.clock() >= self.deadline + delay
+
+    def skip(self, delay):
+        self.deadline += delay
+        self.frames_skipped += 1
+
+    def advance(self, delay, words=1, lateness=0.0):
+        """Record a shown frame and move the deadline past it."""
+        self.lateness.append(lateness)
+        self.words_shown += words
+        self.frames_shown += 1
+        self.deadline += delay
+
+    def stats(self):
+        """Delivered rate and timing jitter for the frames shown so far."""
+        elapsed = self.active_time
+        if self._segment_start is not None:
+            elapsed += self.clock() - self._segment_start
+
+        samples = sorted(self.lateness)
+        count = len(samples)
+        if count:
+            mean = sum(samples) / count
+            jitter = (sum((s - mean) ** 2 for s in samples) / count) ** 0.5
+            p95 = samples[min(count - 1, int(count * 0.95))]
+            worst = samples[-1]
+        else:
+            mean = jitter = p95 = worst = 0.0
+
+        return {
+            "actual_wpm": self.words_shown / elapsed * 60 if elapsed > 0 else 0.0,
+            "frames_shown": self.frames_shown,
+            "frames_skipped": self.frames_skipped,
+            "mean_lateness_ms": mean * 1000,
+            "jitter_ms": jitter * 1000,
+            "p95_lateness_ms": p95 * 1000,
+            "max_lateness_ms": worst * 1000,
+        }
@@ -0,0 +1,122 @@
+# parallel.py
+import os
+import re
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from document import Document, find_sentence_starts
+from loader import iter_text_chunks
+from tokenizer import PARAGRAPH_BREAK_RE, tokenize_paragraphs
+
+# Characters per shard handed to a worker process
+SHARD_SIZE = 4 * 1024 * 1024
+
+# The last character of a word followed by whitespace
+WORD_END_RE = re.compile(r"\S(?=\s)")
+
+# Inputs smaller than this are tokenized in-process; a pool costs more
+PARALLEL_THRESHOLD = 2 * SHARD_SIZE
+
+
+def split_shards(text, shard_size=SHARD_SIZE):
+    """Split text into pieces of roughly shard_size characters.
+
+    Pieces end at a paragraph break where there is one within the next
+    shard_size characters, else at the next whitespace, and always at the
+    start of a whitespace run. Tokenizing the pieces separately therefore
+    gives the same tokens and paragraph offsets as tokenizing the whole.
+    """
+    shards = []
+    start = 0
+    length = len(text)
+    while length - start > shard_size:
+        target = start + shard_size
+        match = PARAGRAPH_BREAK_RE.search(text, target, target + shard_size)
+        cut = start
+        if match:
+            cut = match.start()
+            while cut > start and text[cut - 1].isspace():
+                cut -= 1
+        if cut <= start:
+            word_end = WORD_END_RE.search(text, max(start, target - 1))
+            cut = word_end.end() if word_end else length
+        shards.append(text[start:cut])
+        start = cut
+    shards.append(text[start:])
+    return shards
+
+
+def tokenize_shard(text):
+    """Worker side of parallel tokenizing.
+
+    Returns (joined tokens, token count, paragraph starts, sentence starts).
+    Tokens never contain spaces, so they travel back as one space-joined
+    string, which pickles far faster than a list of millions of strings.
+    """
+    tokens, paragraph_starts = tokenize_paragraphs(text)
+    sentence_starts = array('I', find_sentence_starts(tokens))
+    return " ".join(tokens), len(tokens), paragraph_starts, sentence_starts
+
+
+def add_shard(document, result):
+    joined, token_count, paragraph_starts, sentence_starts = result
+    document.extend_joined(joined, token_count, paragraph_starts, sentence_starts)
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def ordered_map(executor, func, items, window, *args):
+    """Like executor.map, but keeps at most `window` items in flight.
+
+    Results are yielded in input order; items is consumed lazily, so an
+    unbounded stream of inputs runs in bounded memory.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def preprocess_text_parallel(text, workers=None, shard_size=SHARD_SIZE, executor=None):
+    """Tokenize text across worker processes into a Document.
+
+    The result is identical to Document.from_text(text). Small inputs are
+    tokenized in-process.
+    """
+    workers = workers or default_workers()
+    if executor is None and (workers < 2 or len(text) < PARALLEL_THRESHOLD):
+        return Document.from_text(text)
+
+    document = Document()
+    shards = split_shards(text, shard_size)
+    if executor is not None:
+        for result in ordered_map(executor, tokenize_shard, shards, 2 * workers):
+            add_shard(document, result)
+        return document
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in ordered_map(pool, tokenize_shard, shards, 2 * workers):
+            add_shard(document, result)
+    return document
+
+
+def preprocess_file_parallel(file_path, executor, workers=None,
+                             shard_size=SHARD_SIZE, hasher=None):
+    """Tokenize a file across worker processes into a Document.
+
+    The file is read in shard_size pieces cut at whitespace, so at most
+    two pieces per worker are held in memory at a time. With a hasher the
+    raw bytes are hashed on the way, as StreamingLoader does.
+    """
+    workers = workers or default_workers()
+    document = Document()
+    shards = (text for text, _ in iter_text_chunks(file_path, shard_size,
+                                                   hasher=hasher))
+    for result in ordered_map(executor, tokenize_shard, shards, 2 * workers):
+        add_shard(document, result)
+    return document
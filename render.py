@@ -0,0 +1,295 @@
+# render.py
+import queue
+import time
+from collections import OrderedDict
+from tkinter import font as tkfont
+
+# Pushed by the reader when it runs off the end of the text
+FINISHED = object()
+
+
+class FramePump:
+    """Hands frames from the reader thread to Tk on the main thread.
+
+    The reader only ever calls push(), which never touches Tcl. A single
+    root.after loop drains the bounded queue and renders just the newest
+    frame, so a backlog built up while Tk was busy is coalesced into one
+    redraw instead of being replayed. While playback is paused the loop is
+    suspended, so Tk sleeps; expect() runs it briefly to pick up a frame
+    drawn for a seek made while paused.
+    """
+
+    def __init__(self, root, render, on_finished, interval_ms=8, maxsize=64):
+        self.root = root
+        self.render = render
+        self.on_finished = on_finished
+        self.interval_ms = interval_ms
+        self.frames = queue.Queue(maxsize=maxsize)
+        self.frames_rendered = 0
+        self.frames_coalesced = 0
+        self._after_id = None
+        self._suspended = False
+        self._expect_until = 0.0  # keep pumping while suspended until then
+
+    def push(self, frame):
+        """Queue a frame from any thread, dropping the oldest if full."""
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.frames_coalesced += 1
+                except queue.Empty:
+                    pass
+
+    def start(self):
+        self._suspended = False
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._pump)
+
+    def suspend(self):
+        """Stop polling until start(), keeping any queued frames."""
+        self._suspended = True
+        self._expect_until = 0.0
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def expect(self, timeout=0.25):
+        """While suspended, poll until the next frame is drawn or timeout passes."""
+        self._expect_until = time.perf_counter() + timeout
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._pump)
+
+    def stop(self):
+        self.suspend()
+        self._suspended = False
+        self.clear()
+
+    def clear(self):
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                return
+
+    def _pump(self):
+        self._after_id = None
+        latest = None
+        finished = False
+        while True:
+            try:
+                frame = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            if frame is FINISHED:
+                finished = True
+                continue
+            if latest is not None:
+                self.frames_coalesced += 1
+            latest = frame
+
+        if latest is not None:
+            self.render(latest)
+            self.frames_rendered += 1
+            self._expect_until = 0.0
+        if finished:
+            self.on_finished()
+            return
+        if not self._suspended or time.perf_counter() < self._expect_until:
+            self._after_id = self.root.after(self.interval_ms, self._pump)
+
+
+class TextMeasurer:
+    """LRU cache of rendered text widths keyed by (text, family, size).
+
+    Widths come from tkinter.font.Font.measure, so a word that has been
+    seen before costs a dict lookup instead of creating, measuring and
+    deleting a temporary canvas item.
+    """
+
+    def __init__(self, root, weight="bold", maxsize=8192):
+        self.root = root
+        self.weight = weight
+        self.maxsize = maxsize
+        self.widths = OrderedDict()
+        self.fonts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_font(self, family, size):
+        key = (family, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = tkfont.Font(root=self.root, family=family, size=size,
+                               weight=self.weight)
+            self.fonts[key] = font
+        return font
+
+    def measure(self, text, family, size):
+        key = (text, family, size)
+        width = self.widths.get(key)
+        if width is not None:
+            self.hits += 1
+            self.widths.move_to_end(key)
+            return width
+
+        self.misses += 1
+        width = self.get_font(family, size).measure(text)
+        self.widths[key] = width
+        if len(self.widths) > self.maxsize:
+            self.widths.popitem(last=False)
+        return width
+
+    def glyph_widths(self, family, size, chars):
+        """Advance width of each character, for laying text out without Tk."""
+        font = self.get_font(family, size)
+        return {char: font.measure(char) for char in chars}
+
+    def fit_font_size(self, text, family, size, max_width, min_size=12, max_size=48):
+        """Largest size up to `size` at which text fits in max_width pixels.
+
+        Text width scales linearly with point size, so a single cached
+        measurement at the preferred size is enough to solve for the fit.
+        """
+        if not text:
+            return size
+        width = self.measure(text, family, size)
+        if width <= max_width:
+            return size
+        return max(min_size, min(int(size * max_width / width), max_size))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self.widths)}
+
+
+class RetainedRenderer:
+    """Remembers the options last applied to canvas items and widgets.
+
+    Every setter compares against what was sent before and issues a Tcl
+    command only for the options that actually changed, so a frame where
+    little moved costs little. Anything that changes these options must go
+    through the renderer, or call invalidate(), to keep the record true.
+    """
+
+    def __init__(self):
+        self.applied = {}
+
+    def _changed(self, key, options):
+        applied = self.applied.setdefault(key, {})
+        changed = {name: value for name, value in options.items()
+                   if name not in applied or applied[name] != value}
+        applied.update(changed)
+        return changed
+
+    def itemconfig(self, canvas, item, **options):
+        changed = self._changed((canvas, item), options)
+        if changed:
+            canvas.itemconfig(item, **changed)
+        return bool(changed)
+
+    def coords(self, canvas, item, x, y):
+        if self._changed((canvas, item, "coords"), {"xy": (x, y)}):
+            canvas.coords(item, x, y)
+
+    def config(self, widget, **options):
+        changed = self._changed(widget, options)
+        if changed:
+            widget.configure(**changed)
+        return bool(changed)
+
+    def invalidate(self):
+        self.applied.clear()
+
+
+class TransitionEngine:
+    """Fades, or slides and fades, the word rows in after each word change.
+
+    Steps run on root.after between frames, with colors taken from the
+    palette's precomputed ramps. A new word always cancels whatever is
+    still running and snaps it to its final state, so a transition never
+    holds back the word schedule. The number of steps shrinks with the
+    time available per word and with the measured render cost, down to
+    no animation at all at high WPM.
+    """
+
+    MODES = ("none", "fade", "slide")
+    FRAME_SECONDS = 1 / 60
+
+    def __init__(self, root, canvas, renderer, items, colors, max_steps=10, mode="fade",
+                 budget=0.4, max_duration=0.15, slide_offset=24):
+        self.root = root
+        self.canvas = canvas
+        self.renderer = renderer
+        self.items = items
+        self.colors = colors  # palette key each item fades in to
+        self.max_steps = max_steps
+        self.mode = mode
+        self.budget = budget  # share of the per-word interval spent animating
+        self.max_duration = max_duration
+        self.slide_offset = slide_offset
+        self.render_cost = 0.0  # seconds per render, fed from the profiler
+        self._after_id = None
+        self._palette = None
+        self._positions = ()
+        self._ramps = ()
+        self._step = 0
+        self._steps = 0
+        self._step_ms = 0
+
+    def steps_for(self, interval):
+        """Steps that fit the per-word interval; below 2 means don't animate."""
+        if self.mode == "none":
+            return 0
+        duration = min(self.max_duration, interval * self.budget)
+        step_seconds = max(self.FRAME_SECONDS, 2 * self.render_cost)
+        return min(self.max_steps, int(duration / step_seconds))
+
+    def start(self, palette, positions, interval):
+        """Animate the items in for a word that has just been drawn.
+
+        positions holds each item's resting (x, y), the slide's end point.
+        """
+        self.finish()
+        steps = self.steps_for(interval)
+        if steps < 2:
+            return
+        self._palette = palette
+        self._positions = positions
+        self._steps = steps
+        self._step_ms = max(1, int(min(self.max_duration, interval * self.budget) * 1000 / steps))
+        self._ramps = tuple(palette.ramp("background", color, steps) for color in self.colors)
+        # Begin one step in, so the new word is never fully invisible
+        self._step = 1
+        self._draw()
+        self._after_id = self.root.after(self._step_ms, self._advance)
+
+    def finish(self):
+        """Stop any running transition and show its final state."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+            self._step = self._steps
+            self._draw()
+
+    def _advance(self):
+        self._step += 1
+        self._draw()
+        if self._step < self._steps:
+            self._after_id = self.root.after(self._step_ms, self._advance)
+        else:
+            self._after_id = None
+
+    def _draw(self):
+        step = self._step
+        for item, ramp in zip(self.items, self._ramps):
+            self.renderer.itemconfig(self.canvas, item, fill=ramp[step])
+        if self.mode == "slide" and self._positions:
+            # Ease out: move quickly at first, then settle into place
+            remaining = (1 - step / self._steps) ** 2
+            offset = int(self.slide_offset * remaining)
+            for item, (x_pos, y_pos) in zip(self.items, self._positions):
+                self.renderer.coords(self.canvas, item, x_pos, y_pos + offset)
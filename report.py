@@ -0,0 +1,155 @@
+# report.py
+import csv
+import glob
+import json
+import os
+from collections import Counter
+
+from loader import READABLE_EXTENSIONS, iter_text_chunks
+from schedule import word_delay
+from tokenizer import tokenize
+
+
+def iter_text_files(patterns):
+    """Yield text, EPUB and HTML files under each directory, or matching each glob, lazily."""
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for directory, subdirectories, names in os.walk(pattern):
+                subdirectories.sort()
+                for name in sorted(names):
+                    if name.lower().endswith(READABLE_EXTENSIONS):
+                        yield os.path.join(directory, name)
+        else:
+            yield from sorted(glob.iglob(pattern, recursive=True))
+
+
+def is_punctuation(token):
+    # Tokens are \w+ runs or a single non-word character
+    return len(token) == 1 and not (token.isalnum() or token == "_")
+
+
+class ReadingReport:
+    """Reading time for one document under given speed and chunk settings.
+
+    Uses the same rules as ReadingSchedule, so total_seconds matches the
+    schedule's total_time. Tokens are consumed in batches; only a partial
+    chunk is carried between batches, so memory does not grow with the
+    document.
+    """
+
+    def __init__(self, path, wpm, words_per_chunk, punctuation_delays):
+        self.path = path
+        self.words_per_chunk = words_per_chunk
+        self.chunk_delay = 60 / wpm * words_per_chunk
+        self.punctuation_delays = punctuation_delays
+        self.tokens = 0
+        self.words = 0
+        self.chunks = 0
+        self.total_seconds = 0.0
+        self.pause_counts = dict.fromkeys(punctuation_delays, 0)
+        self.pause_seconds = dict.fromkeys(punctuation_delays, 0.0)
+        self._carry = []
+
+    def feed(self, tokens):
+        tokens = self._carry + tokens
+        usable = len(tokens) - len(tokens) % self.words_per_chunk
+        self._carry = tokens[usable:]
+        self._add(tokens[:usable], self.words_per_chunk)
+
+    def finish(self):
+        """Account for a final partial chunk; returns self."""
+        if self._carry:
+            self._add(self._carry, len(self._carry))
+            self._carry = []
+        return self
+
+    def _add(self, tokens, chunk_size):
+        if not tokens:
+            return
+        # Every chunk here has chunk_size tokens and shows for the mean of
+        # their delays, so the batch's time is the sum of all token delays
+        # over chunk_size. A token's delay depends only on the token, so
+        # that sum is taken over distinct tokens instead of every token.
+        counts = Counter(tokens)
+        chunk_delay = self.chunk_delay
+        punctuation_delays = self.punctuation_delays
+        self.total_seconds += sum(count * word_delay(token, chunk_delay, punctuation_delays)
+                                  for token, count in counts.items()) / chunk_size
+        self.chunks += len(tokens) // chunk_size
+        self.tokens += len(tokens)
+        self.words += len(tokens) - sum(count for token, count in counts.items()
+                                        if is_punctuation(token))
+
+        # Likewise each pause adds its extra delay divided by the chunk size
+        for mark, multiplier in punctuation_delays.items():
+            count = counts.get(mark)
+            if count:
+                self.pause_counts[mark] += count
+                self.pause_seconds[mark] += (count * chunk_delay
+                                             * (multiplier - 1) / chunk_size)
+
+    def as_dict(self):
+        return {
+            "path": self.path,
+            "words": self.words,
+            "tokens": self.tokens,
+            "chunks": self.chunks,
+            "seconds": round(self.total_seconds, 3),
+            "pause_seconds": round(sum(self.pause_seconds.values()), 3),
+            "pauses": {mark: {"count": self.pause_counts[mark],
+                              "seconds": round(self.pause_seconds[mark], 3)}
+                       for mark in self.punctuation_delays},
+        }
+
+
+def report_file(path, wpm, words_per_chunk, punctuation_delays):
+    """Build the report for one file; runs in a worker process."""
+    report = ReadingReport(path, wpm, words_per_chunk, punctuation_delays)
+    try:
+        for text, _ in iter_text_chunks(path):
+            report.feed(tokenize(text))
+    except (OSError, ValueError) as e:
+        return {"path": path, "error": str(e)}
+    return report.finish().as_dict()
+
+
+class JSONReportWriter:
+    """Writes reports as one JSON array, one document at a time."""
+
+    def __init__(self, file, punctuation_delays):
+        self.file = file
+        self.count = 0
+
+    def write(self, record):
+        self.file.write("[\n" if not self.count else ",\n")
+        self.file.write(json.dumps(record))
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]\n" if self.count else "[]\n")
+
+
+class CSVReportWriter:
+    """Writes reports as CSV with a count and seconds column per punctuation mark."""
+
+    def __init__(self, file, punctuation_delays):
+        self.marks = list(punctuation_delays)
+        self.writer = csv.writer(file)
+        header = ["path", "words", "tokens", "chunks", "seconds", "pause_seconds"]
+        for mark in self.marks:
+            header += [f"{mark} count", f"{mark} seconds"]
+        self.writer.writerow(header)
+
+    def write(self, record):
+        row = [record["path"], record["words"], record["tokens"], record["chunks"],
+               record["seconds"], record["pause_seconds"]]
+        for mark in self.marks:
+            pause = record["pauses"][mark]
+            row += [pause["count"], pause["seconds"]]
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+REPORT_WRITERS = {"json": JSONReportWriter, "csv": CSVReportWriter}
@@ -0,0 +1,293 @@
+# schedule.py
+import threading
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, repeat
+from operator import add, mul, truediv
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Length multiplier indexed by min(len(word), 9), matching word_delay
+LENGTH_MULTIPLIERS = (1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.25, 1.25, 1.5)
+
+
+def word_delay(word, chunk_delay, punctuation_delays):
+    """Delay in seconds for a single token, given the base delay of a chunk.
+
+    Tokens come from tokenizer.tokenize, where punctuation is always a token
+    of its own, so the punctuation pause is a single dict lookup.
+    """
+    delay = chunk_delay
+
+    if len(word) > 8:
+        delay *= 1.5
+    elif len(word) > 6:
+        delay *= 1.25
+
+    mult = punctuation_delays.get(word)
+    if mult is not None:
+        delay *= mult
+
+    return delay
+
+
+def token_delays(tokens, chunk_delay, punctuation_delays):
+    """Delays for a whole token list at once, same rules as word_delay.
+
+    Returns a NumPy array when NumPy is installed and an array('d')
+    otherwise.
+    """
+    count = len(tokens)
+    lengths = map(len, tokens)
+    puncts = map(punctuation_delays.get, tokens, repeat(1.0, count))
+
+    if np is not None:
+        lengths = np.fromiter(lengths, dtype=np.int64, count=count)
+        delays = np.where(lengths > 8, 1.5, np.where(lengths > 6, 1.25, 1.0))
+        delays *= chunk_delay
+        delays *= np.fromiter(puncts, dtype=np.float64, count=count)
+        return delays
+
+    # Per-length base delays, so the whole batch runs through C-level maps
+    lengths = list(lengths)
+    longest = max(lengths, default=0)
+    table = [chunk_delay * LENGTH_MULTIPLIERS[min(length, 9)]
+             for length in range(longest + 1)]
+    return array('d', map(mul, map(table.__getitem__, lengths), puncts))
+
+
+def chunk_means(delays, words_per_chunk):
+    """Average delay of each consecutive chunk; the last may be partial."""
+    count = len(delays)
+    if words_per_chunk == 1:
+        return delays
+    if np is not None:
+        starts = np.arange(0, count, words_per_chunk)
+        sizes = np.minimum(words_per_chunk, count - starts)
+        return np.add.reduceat(delays, starts) / sizes if count else delays
+
+    # Sum strided slices so each column of the chunk grid is one C-level map
+    full = count - count % words_per_chunk
+    sums = delays[0:full:words_per_chunk]
+    for column in range(1, words_per_chunk):
+        sums = map(add, sums, delays[column:full:words_per_chunk])
+    means = array('d', map(truediv, sums, repeat(words_per_chunk)))
+    if full < count:
+        means.append(sum(delays[full:]) / (count - full))
+    return means
+
+
+def scale_delays(delays, factors):
+    """Multiply delays elementwise by an array('d') of factors."""
+    if np is not None and isinstance(delays, np.ndarray):
+        return delays * np.frombuffer(factors, dtype=np.float64)
+    return array('d', map(mul, delays, factors))
+
+
+def _extend(target, values):
+    """Append a NumPy array or array('d') onto an array('d')."""
+    if np is not None and isinstance(values, np.ndarray):
+        target.frombytes(values.astype(np.float64).tobytes())
+    else:
+        target.extend(values)
+
+
+class ReadingSchedule:
+    """Precompiled playback plan: chunk boundaries and delays.
+
+    Playback only has to walk a chunk index; everything that used to be
+    recomputed on every tick is looked up from flat arrays. Display strings
+    are not stored: a Document hands each chunk out straight from its
+    encoded tokens. A schedule can be extended as more words arrive, e.g.
+    while a large file streams in.
+    """
+
+    def __init__(self, words, wpm, words_per_chunk, punctuation_delays,
+                 focus_layout=None, difficulty=None):
+        self.words = words
+        self.wpm = wpm
+        self.words_per_chunk = max(1, int(words_per_chunk))
+        self.chunk_delay = 60 / wpm * self.words_per_chunk
+        # Copy so a concurrent edit of the settings dict can't change mid-compile
+        self.punctuation_delays = dict(punctuation_delays)
+        # With an orp.FocusLayout, where each chunk's focus letter is
+        self.focus_layout = focus_layout
+        # With a lexicon.DifficultyModel, rare words get more time
+        self.difficulty = difficulty
+
+        self.chunk_starts = array('I')  # word offset of each chunk
+        self.delays = array('d')  # seconds per chunk
+        self.elapsed = array('d')  # seconds from the start to each chunk
+        self.focus_indices = array('I')  # focus letter of each chunk's text
+        self.focus_offsets = array('f')  # pixels from the text's left edge to it
+        self.text_widths = array('f')  # pixels, at the layout's reference size
+        self.total_time = 0.0
+        self.compiled_words = 0
+        self.chunk_count = 0
+        self.complete = False
+
+    def __len__(self):
+        return self.chunk_count
+
+    @property
+    def total_words(self):
+        return self.compiled_words
+
+    def extend_to(self, word_count, final=True):
+        """Compile chunks for words up to word_count.
+
+        Unless final, a trailing partial chunk is left for a later call so
+        chunk boundaries never change once a chunk has been played.
+        """
+        words = self.words
+        size = self.words_per_chunk
+        start = self.compiled_words
+        limit = word_count if final else word_count - word_count % size
+        if limit <= start:
+            self.complete = final
+            return
+
+        tokens = words[start:limit]
+        delays = token_delays(tokens, self.chunk_delay, self.punctuation_delays)
+        if self.difficulty is not None:
+            # One batched lexicon lookup for the whole range being compiled
+            delays = scale_delays(delays, self.difficulty.factors(tokens))
+        means = chunk_means(delays, size)
+        delays = self.delays
+        offset = len(delays)
+        _extend(delays, means)
+
+        # Prefix sums make elapsed and remaining time exact lookups
+        starts_at = list(accumulate(delays[offset:], initial=self.total_time))
+        self.total_time = starts_at.pop()
+        self.elapsed.extend(starts_at)
+        self.chunk_starts.extend(range(start, limit, size))
+        self.compiled_words = limit
+        if self.focus_layout is not None:
+            texts = tokens if size == 1 else [" ".join(tokens[i:i + size])
+                                              for i in range(0, len(tokens), size)]
+            self.focus_layout.extend(texts, self.focus_indices, self.focus_offsets,
+                                     self.text_widths, cache=size == 1)
+
+        # Set last: readers use the chunk count as the playable length
+        self.chunk_count = len(self.chunk_starts)
+        self.complete = final
+
+    def remaining_time(self, index):
+        """Seconds of compiled playback from the start of chunk index to the end."""
+        if index >= len(self.elapsed):
+            return 0.0
+        return self.total_time - self.elapsed[index]
+
+    def chunk_at_time(self, seconds):
+        """Index of the chunk on screen at the given playback time."""
+        if not self.chunk_count:
+            return 0
+        index = bisect_right(self.elapsed, seconds) - 1
+        return max(0, min(index, self.chunk_count - 1))
+
+    def chunk_text(self, index):
+        """Display string for a chunk: its words joined by single spaces."""
+        start = self.chunk_starts[index]
+        stop = start + self.chunk_word_count(index)
+        words = self.words
+        if stop - start == 1:
+            return words[start]
+        if hasattr(words, "chunk_text"):
+            return words.chunk_text(start, stop)
+        return " ".join(words[start:stop])
+
+    def focus(self, index):
+        """(focus index, offset, width) for a chunk, or None without a focus layout."""
+        if self.focus_layout is None:
+            return None
+        return self.focus_indices[index], self.focus_offsets[index], self.text_widths[index]
+
+    def display(self, index):
+        """Return the (previous, current, next) strings for a chunk index."""
+        prev_chunk = self.chunk_text(index - 1) if index > 0 else ""
+        next_chunk = self.chunk_text(index + 1) if index + 1 < self.chunk_count else ""
+        return prev_chunk, self.chunk_text(index), next_chunk
+
+    def chunk_word_count(self, index):
+        end = (self.chunk_starts[index + 1] if index + 1 < len(self.chunk_starts)
+               else self.compiled_words)
+        return end - self.chunk_starts[index]
+
+    def chunk_at_word(self, word_index):
+        """Index of the chunk containing the given word offset."""
+        if not self.chunk_count:
+            return 0
+        return max(0, bisect_right(self.chunk_starts, word_index) - 1)
+
+
+def compile_schedule(words, wpm, words_per_chunk, punctuation_delays, final=True,
+                     focus_layout=None, difficulty=None):
+    """Turn a preprocessed word list into a ReadingSchedule."""
+    schedule = ReadingSchedule(words, wpm, words_per_chunk, punctuation_delays,
+                               focus_layout, difficulty)
+    schedule.extend_to(len(words), final)
+    return schedule
+
+
+def parse_timestamp(text):
+    """Parse "ss", "mm:ss" or "h:mm:ss" into seconds; ValueError if malformed."""
+    seconds = 0.0
+    for part in text.strip().split(":"):
+        value = float(part)
+        if value < 0:
+            raise ValueError(f"Invalid time: {text!r}")
+        seconds = seconds * 60 + value
+    return seconds
+
+
+class ScheduleCompiler:
+    """Recompiles schedules on a background thread.
+
+    Requests made while a compile is running are coalesced, so dragging the
+    WPM slider only ever costs one compile in flight plus the latest one.
+    A compile that raises is skipped and its exception kept in error;
+    later requests still run.
+    """
+
+    def __init__(self, on_ready):
+        self.on_ready = on_ready
+        self.error = None  # exception from the last failed compile
+        self._lock = threading.Lock()
+        self._pending = None
+        self._busy = False
+
+    def submit(self, words, wpm, words_per_chunk, punctuation_delays, final=True,
+               focus_layout=None, difficulty=None):
+        with self._lock:
+            self._pending = (words, wpm, words_per_chunk,
+                             dict(punctuation_delays), final, focus_layout, difficulty)
+            if self._busy:
+                return
+            self._busy = True
+        worker = threading.Thread(target=self._run)
+        worker.daemon = True
+        worker.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                args = self._pending
+                self._pending = None
+                if args is None:
+                    self._busy = False
+                    return
+            try:
+                schedule = compile_schedule(*args)
+                with self._lock:
+                    stale = self._pending is not None
+                if not stale:
+                    self.on_ready(schedule)
+            except Exception as e:
+                # Keep the worker alive so later settings changes still apply
+                self.error = e
+                continue
+            self.error = None
@@ -0,0 +1,138 @@
+# search.py
+import threading
+from array import array
+from bisect import bisect_left
+
+from lexicon import SortedWords
+from tokenizer import tokenize
+
+# Tokens indexed per step; the index lock is held for one step at a time,
+# short enough that searching or playback never waits noticeably
+INDEX_BATCH = 5000
+
+# Most occurrences listed for one search; the count still covers them all
+MAX_SEARCH_RESULTS = 1000
+
+
+def is_indexed(token):
+    # Words and numbers are indexed, single punctuation marks are not
+    return len(token) > 1 or token.isalnum()
+
+
+def encode_gap(data, gap):
+    """Append a non-negative int to a bytearray as a varint."""
+    while gap >= 0x80:
+        data.append(gap & 0x7F | 0x80)
+        gap >>= 7
+    data.append(gap)
+
+
+def decode_gaps(data):
+    """Word positions from varint-encoded gaps."""
+    positions = array('I')
+    position = value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        position += value
+        positions.append(position)
+        value = shift = 0
+    return positions
+
+
+class SearchIndex:
+    """Inverted index from lowercased terms to the positions of their words.
+
+    Positions are stored as varint-encoded gaps, about a byte and a half
+    per word. While the document is still being indexed, postings live in
+    a dict of bytearrays; freeze() then packs the terms and postings into
+    a few flat arrays and drops the dict, leaving an index well under half
+    the size of the document's text.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.size = 0  # tokens indexed so far
+        self.complete = False
+        self._lock = threading.Lock()
+        self._postings = {}  # term -> bytearray of gaps, while building
+        self._last = {}  # term -> last position added
+        self._terms = None  # SortedWords of UTF-8 terms once frozen
+        self._term_postings = None
+        self._posting_offsets = None
+
+    def add(self, start, stop):
+        """Index the document's tokens from start to stop."""
+        tokens = self.document[start:stop]
+        with self._lock:
+            postings, last = self._postings, self._last
+            for position, token in enumerate(tokens, start):
+                if not is_indexed(token):
+                    continue
+                term = token.lower()
+                data = postings.get(term)
+                if data is None:
+                    data = postings[term] = bytearray()
+                    gap = position
+                else:
+                    gap = position - last[term]
+                last[term] = position
+                encode_gap(data, gap)
+            self.size = stop
+
+    def freeze(self):
+        """Pack the finished index into flat arrays."""
+        with self._lock:
+            terms = sorted(self._postings)
+            keys = [term.encode("utf-8") for term in terms]
+            term_offsets = array('I', [0])
+            posting_offsets = array('I', [0])
+            for key, term in zip(keys, terms):
+                term_offsets.append(term_offsets[-1] + len(key))
+                posting_offsets.append(posting_offsets[-1] + len(self._postings[term]))
+            self._term_postings = b"".join(map(self._postings.__getitem__, terms))
+            self._posting_offsets = posting_offsets
+            self._terms = SortedWords(term_offsets, b"".join(keys))
+            self._postings = self._last = None
+            self.complete = True
+
+    def positions(self, term):
+        """Positions of every word equal to term, ignoring case, in order."""
+        term = term.lower()
+        with self._lock:
+            if self._postings is not None:
+                return decode_gaps(self._postings.get(term, b""))
+            key = term.encode("utf-8")
+            index = bisect_left(self._terms, key)
+            if index == len(self._terms) or self._terms[index] != key:
+                return array('I')
+            offsets = self._posting_offsets
+            return decode_gaps(self._term_postings[offsets[index]:offsets[index + 1]])
+
+    def search(self, query):
+        """Positions where the words of query occur in sequence, ignoring case."""
+        tokens = [token.lower() for token in tokenize(query)]
+        terms = [token for token in tokens if is_indexed(token)]
+        if not terms:
+            return array('I')
+        # Look up the first word's positions, then check the rest in place
+        first = tokens.index(terms[0])
+        hits = self.positions(terms[0])
+        if len(tokens) == 1:
+            return hits
+        document = self.document
+        count = len(tokens)
+        return array('I', (position - first for position in hits
+                           if position >= first
+                           and [token.lower() for token in
+                                document[position - first:position - first + count]] == tokens))
+
+    def nbytes(self):
+        """Approximate memory held by the index."""
+        with self._lock:
+            if self._postings is not None:
+                return sum(len(term) + len(data) + 120 for term, data in self._postings.items())
+            return (len(self._term_postings) + len(self._terms.blob)
+                    + 4 * (len(self._posting_offsets) + len(self._terms.offsets)))
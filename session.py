@@ -0,0 +1,158 @@
+# session.py
+import json
+import os
+import threading
+import time
+
+# Journal lines kept before the file is compacted into a snapshot
+COMPACT_AFTER = 2000
+
+# Documents whose position is remembered, most recently read first
+MAX_DOCUMENTS = 500
+
+
+def default_session_path():
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "focusflow", "session.jsonl")
+
+
+class SessionStore:
+    """Reading positions and settings, persisted as an append-only journal.
+
+    Recording only updates memory, so it is safe to call on every playback
+    tick. A background thread appends whatever changed every
+    flush_interval seconds in a single write; a torn final line left by a
+    crash is skipped on load, and the journal is periodically compacted
+    into a snapshot via an atomic rename.
+    """
+
+    def __init__(self, path=None, flush_interval=3.0):
+        self.path = path or default_session_path()
+        self.flush_interval = flush_interval
+        self.positions = {}  # document key -> (word index, last read time)
+        self.settings = {}
+        self._pending_positions = {}
+        self._pending_settings = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._journal_lines = 0
+        self._needs_newline = False
+        self._thread = None
+
+    def load(self):
+        """Replay the journal into memory; missing or damaged lines are ignored."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    self._journal_lines += 1
+                    # A crash mid-write can leave the last line unterminated
+                    self._needs_newline = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "settings" in record:
+                        self.settings.update(record["settings"])
+                    elif "document" in record:
+                        self.positions[record["document"]] = (record["word"], record["time"])
+        except OSError:
+            pass
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def get_position(self, *keys):
+        """Saved word index for the first key that has one, else 0."""
+        for key in keys:
+            if key in self.positions:
+                return self.positions[key][0]
+        return 0
+
+    def record_position(self, key, word_index):
+        if key is None:
+            return
+        entry = (word_index, time.time())
+        with self._lock:
+            self.positions[key] = entry
+            self._pending_positions[key] = entry
+
+    def record_settings(self, **settings):
+        with self._lock:
+            self.settings.update(settings)
+            self._pending_settings.update(settings)
+
+    def flush(self):
+        """Append pending changes to the journal in one write."""
+        with self._lock:
+            positions, self._pending_positions = self._pending_positions, {}
+            settings, self._pending_settings = self._pending_settings, {}
+        if not positions and not settings:
+            return
+
+        lines = []
+        if settings:
+            lines.append(json.dumps({"settings": settings}))
+        for key, (word_index, read_time) in positions.items():
+            lines.append(json.dumps({"document": key, "word": word_index, "time": read_time}))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        if self._needs_newline:
+            data = b"\n" + data
+
+        with self._io_lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+                self._needs_newline = False
+                self._journal_lines += len(lines)
+                if self._journal_lines > COMPACT_AFTER:
+                    self._compact()
+            except OSError:
+                # Keep the changes so the next flush retries them
+                with self._lock:
+                    for key, entry in positions.items():
+                        self._pending_positions.setdefault(key, entry)
+                    for name, value in settings.items():
+                        self._pending_settings.setdefault(name, value)
+
+    def request_flush(self):
+        """Ask the background thread to flush now instead of at the next interval."""
+        self._wake.set()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def _compact(self):
+        with self._lock:
+            settings = dict(self.settings)
+            recent = sorted(self.positions.items(), key=lambda item: item[1][1],
+                            reverse=True)[:MAX_DOCUMENTS]
+            self.positions = dict(recent)
+
+        lines = [json.dumps({"settings": settings})]
+        for key, (word_index, read_time) in reversed(recent):
+            lines.append(json.dumps({"document": key, "word": word_index, "time": read_time}))
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        self._journal_lines = len(lines)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
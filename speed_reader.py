@@ -3,18 +3,32 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import time
-import threading
-import re
 from themes import ThemeManager
-
-class SpeedReader:
+from schedule import parse_timestamp
+from render import FINISHED, FramePump, RetainedRenderer, TextMeasurer, TransitionEngine
+from loader import READABLE_FILE_TYPES, read_preview, read_text, should_stream
+from document_cache import DocumentCache
+from session import SessionStore
+from engine import ReaderView, ReadingEngine
+from instrumentation import FrameProfiler, TclCallCounter
+from orp import LATIN_CHARS, FocusLayout, GlyphWidths
+from search import MAX_SEARCH_RESULTS
+
+class SpeedReader(ReaderView):
     def __init__(self, root):
         self.root = root
         self.theme_manager = ThemeManager()
         
+        # Restore settings and reading positions from the last session
+        self.session_store = SessionStore().load()
+        settings = self.session_store.settings
+        self.theme_manager.load_user_themes()
+        if settings.get("theme") in self.theme_manager.themes:
+            self.theme_manager.current_theme = settings["theme"]
+        self.session_store.start()
+        
         self.root.title("Enhanced Speed Reader")
         self.root.geometry("800x600")
-        self.theme_manager.apply_theme(self.root)
         
         # Initialize styling
         self.style = ttk.Style()
@@ -23,28 +37,69 @@ class SpeedReader:
         # Define theme-specific styles
         self.configure_styles()
         
-        # Reading configuration
+        # Tokenizing, scheduling and playback live in the engine; this class
+        # only draws what it reports and forwards user input to it
+        self.engine = ReadingEngine(view=self,
+                                    document_cache=DocumentCache(),
+                                    session_store=self.session_store,
+                                    wpm=int(settings.get("wpm", 300)),
+                                    words_per_chunk=int(settings.get("words_per_chunk", 1)))
+        self.engine.set_adaptive(settings.get("adaptive", False))
+        if settings.get("difficulty"):
+            self.engine.set_difficulty(True)
         self.text = ""
-        self.wpm = 300
-        self.words_per_chunk = 1
-        self.running = False
-        self.paused = False
-        self.progress = 0
-        self.base_delay = 60 / self.wpm
-        
-        # Animation configuration
-        self.fade_steps = 10
         
-        # Punctuation delays
-        self.punctuation_delays = {
-            '.': 2.0, '!': 2.0, '?': 2.0,
-            ',': 1.5, ';': 1.5, ':': 1.5,
-            '-': 1.2, '(': 1.2, ')': 1.2
-        }
+        # Animation configuration; fade_steps is the most steps a word
+        # transition may take, fewer are used when words go by faster
+        self.fade_steps = 10
+        self.transition_mode = settings.get("transition", "fade")
+        
+        # Large files are streamed from disk instead of held in the text box
+        self.stream_path = None
+        
+        # All Tk work for playback happens on the main thread via this pump
+        self.frame_pump = FramePump(self.root, self.render_frame,
+                                    self.on_reading_finished)
+        
+        # Display fonts and cached text widths for fitting words to the canvas
+        self.font_family = "Arial"
+        self.row_font_sizes = [24, 36, 24]
+        self.text_measurer = TextMeasurer(self.root)
+        self.displayed_words = ["", "", ""]
+        
+        # The current word is pinned by its focus letter. Glyph widths are
+        # measured once here; the engine lays out every chunk with them
+        # while compiling, so drawing a word never measures anything
+        focus_size = self.row_font_sizes[1]
+        glyphs = self.text_measurer.glyph_widths(self.font_family, focus_size, LATIN_CHARS)
+        self.engine.focus_layout = FocusLayout(GlyphWidths(glyphs, glyphs["M"]), focus_size)
+        self.displayed_focus = None
+        self.current_x = None  # left edge of the current word
+        
+        # Only options that changed since the last frame are sent to Tcl;
+        # row positions and the width limit are recomputed on <Configure>
+        self.renderer = RetainedRenderer()
+        self.canvas_layout = None  # (center_x, row y positions, max text width)
+        
+        # Resize events are coalesced into one layout pass per frame
+        self.layout_after_id = None
+        self.layout_size = None  # canvas size from the latest <Configure>
+        self.last_layout = 0.0
+        
+        # Per-frame render timings, shown by the F12 overlay
+        self.profiler = FrameProfiler()
+        self.tcl_counter = TclCallCounter(self.root.tk)
+        self.overlay_visible = False
+        self.overlay_updated = 0.0
         
         self.setup_frames()
         self.setup_ui()
+        # Count the Tcl commands issued by every widget a frame touches
+        self.tcl_counter.attach(self.canvas, self.progress_bar,
+                                self.reading_progress_bar, self.time_label,
+                                self.reading_time_label)
         self.root.bind('<Configure>', self.on_window_resize)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
        
     def configure_styles(self):
         current_theme = self.theme_manager.current_theme
@@ -63,47 +118,30 @@ class SpeedReader:
                            bordercolor=theme["progress_foreground"],
                            lightcolor=theme["progress_foreground"],
                            darkcolor=theme["progress_foreground"])
+        
+        # Configure ttk Checkbutton style
+        self.style.configure(f"{current_theme}.TCheckbutton",
+                           background=theme["background"],
+                           foreground=theme["text"],
+                           font=('Arial', 10))
     
     def setup_frames(self):
         self.reading_frame = tk.Frame(self.root)
         self.control_frame = tk.Frame(self.root)
-        self.theme_manager.apply_theme(self.reading_frame)
-        self.theme_manager.apply_theme(self.control_frame)
             
     def setup_ui(self):
         self.setup_reading_frame()
         self.setup_control_frame()
         self.show_control_frame()
+        # Register every widget for theming once; switches reuse the registry
+        self.theme_manager.register_tree(self.root)
         self.apply_theme()  # Apply the theme after setting up the UI
         
 
-    def fade_color(self, hex_color, opacity):
-        """Convert color to a faded version by mixing with background."""
-        # Convert hex to RGB
-        r = int(hex_color[1:3], 16)
-        g = int(hex_color[3:5], 16)
-        b = int(hex_color[5:7], 16)
-        
-        # Get background color
-        bg_color = self.theme_manager.get_theme(self.theme_manager.current_theme)["background"]
-        bg_r = int(bg_color[1:3], 16)
-        bg_g = int(bg_color[3:5], 16)
-        bg_b = int(bg_color[5:7], 16)
-        
-        # Mix colors based on opacity
-        mixed_r = int(r * opacity + bg_r * (1 - opacity))
-        mixed_g = int(g * opacity + bg_g * (1 - opacity))
-        mixed_b = int(b * opacity + bg_b * (1 - opacity))
-        
-        return f"#{mixed_r:02x}{mixed_g:02x}{mixed_b:02x}"
-
-
-
     def setup_reading_frame(self):
         # Container for the reading display
         self.display_container = tk.Frame(self.reading_frame)
         self.display_container.pack(expand=True, fill=tk.BOTH)
-        self.theme_manager.apply_theme(self.display_container)
 
         # Create a canvas for better animation control
         self.canvas = tk.Canvas(
@@ -123,9 +161,9 @@ class SpeedReader:
         
         # Create text items with different colors and opacity
         positions = [
-            {"y_offset": -spacing, "color": self.fade_color(theme["text"], 0.3)},  # Previous word (faded)
-            {"y_offset": 0, "color": theme["accent"]},  # Current word (full opacity)
-            {"y_offset": spacing, "color": self.fade_color(theme["text"], 0.3)}  # Next word (faded)
+            {"y_offset": -spacing, "color": theme["faded_text"], "anchor": "center"},  # Previous word (faded)
+            {"y_offset": 0, "color": theme["text"], "anchor": "w"},  # Current word, placed by its focus letter
+            {"y_offset": spacing, "color": theme["faded_text"], "anchor": "center"}  # Next word (faded)
         ]
         
         for pos in positions:
@@ -135,17 +173,43 @@ class SpeedReader:
                 text="",
                 font=("Arial", 48, "bold"),
                 fill=pos["color"],
-                anchor="center"
+                anchor=pos["anchor"]
             )
             self.text_items.append(text_item)
 
+        # The current word's focus letter, drawn over it in the accent color
+        self.focus_item = self.canvas.create_text(
+            400,
+            center_y,
+            text="",
+            font=("Arial", 48, "bold"),
+            fill=theme["accent"],
+            anchor="center"
+        )
+
+        # Fades the rows in after each word change
+        self.transitions = TransitionEngine(self.root, self.canvas, self.renderer,
+                                            self.text_items + [self.focus_item],
+                                            ("faded_text", "text", "faded_text", "accent"),
+                                            max_steps=self.fade_steps,
+                                            mode=self.transition_mode)
+
+        # Performance overlay, toggled with F12
+        self.overlay_item = self.canvas.create_text(
+            10, 10,
+            text="",
+            font=("Courier", 10),
+            fill=theme["overlay_text"],
+            anchor="nw",
+            state="hidden"
+        )
+
         # Bind resize event to canvas
         self.canvas.bind('<Configure>', self.on_canvas_resize)
 
         # Add progress information container
         self.progress_container = tk.Frame(self.reading_frame)
         self.progress_container.pack(side=tk.BOTTOM, fill=tk.X, padx=20, pady=10)
-        self.theme_manager.apply_theme(self.progress_container)
 
         # Add time remaining label
         self.reading_time_label = tk.Label(
@@ -154,7 +218,6 @@ class SpeedReader:
             font=("Arial", 12)
         )
         self.reading_time_label.pack(pady=(0, 5))
-        self.theme_manager.apply_theme(self.reading_time_label)
 
         # Add progress bar
         self.reading_progress_bar = ttk.Progressbar(
@@ -164,11 +227,13 @@ class SpeedReader:
             style=f"{self.theme_manager.current_theme}.Horizontal.TProgressbar"
         )
         self.reading_progress_bar.pack(fill=tk.X, pady=(0, 10))
+        # Click or drag the progress bar to scrub through the text
+        self.reading_progress_bar.bind('<Button-1>', self.seek_to_pointer)
+        self.reading_progress_bar.bind('<B1-Motion>', self.seek_to_pointer)
 
         # Control buttons
         reading_buttons = tk.Frame(self.progress_container)
         reading_buttons.pack(pady=5)
-        self.theme_manager.apply_theme(reading_buttons)
 
         self.reading_pause_button = ttk.Button(
             reading_buttons,
@@ -183,99 +248,253 @@ class SpeedReader:
             command=self.stop_reading
         )
         self.reading_stop_button.pack(side=tk.LEFT, padx=5)
+
+        # Navigation by paragraph and sentence
+        for text, command in (("« Para", lambda: self.seek_paragraphs(-1)),
+                              ("‹ Sent", lambda: self.seek_sentences(-1)),
+                              ("Sent ›", lambda: self.seek_sentences(1)),
+                              ("Para »", lambda: self.seek_paragraphs(1))):
+            ttk.Button(reading_buttons, text=text, width=7,
+                       command=command).pack(side=tk.LEFT, padx=2)
+
+        # Go to a playback time, e.g. 12:30
+        self.goto_entry = ttk.Entry(reading_buttons, width=7)
+        self.goto_entry.pack(side=tk.LEFT, padx=(10, 2))
+        self.goto_entry.bind('<Return>', lambda event: self.seek_to_time_entry())
+        self.goto_button = ttk.Button(reading_buttons, text="Go to",
+                                      command=self.seek_to_time_entry)
+        self.goto_button.pack(side=tk.LEFT, padx=2)
+
+        self.root.bind('<Left>', lambda event: self.seek_sentences(-1))
+        self.root.bind('<Right>', lambda event: self.seek_sentences(1))
+        self.root.bind('<Shift-Left>', lambda event: self.seek_paragraphs(-1))
+        self.root.bind('<Shift-Right>', lambda event: self.seek_paragraphs(1))
+        self.root.bind('<F12>', lambda event: self.toggle_overlay())
+        self.root.bind('<Shift-F12>', lambda event: self.export_profile())
     
 
     def on_canvas_resize(self, event):
         """Handle canvas resize events."""
-        # Update text positions
-        self.canvas.update_idletasks()
-        center_x = event.width // 2
-        center_y = event.height // 2
-        spacing = 80
-        
-        positions = [center_y - spacing, center_y, center_y + spacing]
-        
+        self.layout_size = (event.width, event.height)
+        self.request_layout()
+
+    def request_layout(self):
+        """Schedule a layout pass, unless one is already pending.
+
+        Dragging the window fires a burst of <Configure> events; they all
+        fold into a single pass once Tk is idle, and passes are spaced at
+        least a frame apart.
+        """
+        if self.layout_after_id is not None:
+            return
+        wait_ms = int((self.last_layout + 1 / 60 - time.perf_counter()) * 1000)
+        if wait_ms > 0:
+            self.layout_after_id = self.root.after(wait_ms, self.run_layout)
+        else:
+            self.layout_after_id = self.root.after_idle(self.run_layout)
+
+    def run_layout(self):
+        self.layout_after_id = None
+        self.last_layout = time.perf_counter()
+        width, height = self.layout_size or (self.canvas.winfo_width(),
+                                             self.canvas.winfo_height())
+        self.layout_canvas(width, height)
+        # Words on screen may need a different size for the new width;
+        # their widths come from the measurement cache
+        self.update_display(*self.displayed_words, self.displayed_focus)
+
+    def layout_canvas(self, width, height):
+        """Place the three rows for a canvas of the given size."""
+        self.transitions.finish()
+        center_x = width // 2
+        center_y = height // 2
+        spacing = 80  # Vertical spacing between lines
+        positions = (center_y - spacing, center_y, center_y + spacing)
+        self.canvas_layout = (center_x, positions, width * 0.8)
+
+        # The context rows are centered; the focus letter sits on the
+        # center line and update_display places the current word around it
         for text_item, y_pos in zip(self.text_items, positions):
-            self.canvas.coords(text_item, center_x, y_pos)
+            self.renderer.coords(self.canvas, text_item, center_x, y_pos)
+        self.renderer.coords(self.canvas, self.focus_item, center_x, positions[1])
 
 
-    def update_display(self, prev_word, current_word, next_word):
+    def update_display(self, prev_word, current_word, next_word, focus=None):
         # Update text for each item
         words = [prev_word, current_word, next_word]
+        self.displayed_words = words
+        self.displayed_focus = focus
         
-        # Calculate canvas center
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        center_x = canvas_width // 2
-        center_y = canvas_height // 2
-        spacing = 80
-
-        # Update positions and text
-        positions = [center_y - spacing, center_y, center_y + spacing]
-        
-        # Define font sizes
-        font_size_small = 24
-        font_size_large = 36
+        # Layout normally comes from <Configure>; query once if it hasn't fired
+        if self.canvas_layout is None:
+            self.layout_canvas(self.canvas.winfo_width(), self.canvas.winfo_height())
+        max_width = self.canvas_layout[2]
         
+        self.update_focus_row(current_word, focus)
         for i, (text_item, word) in enumerate(zip(self.text_items, words)):
-            # Update text
-            self.canvas.itemconfig(text_item, text=word if word else "")
-            
-            # Update position
-            self.canvas.coords(text_item, center_x, positions[i])
-            
-            # Adjust font size if needed
+            if i == 1:
+                continue
             if word:
-                # Get current font configuration
-                current_font = self.canvas.itemcget(text_item, "font")
-                
-                # Default font settings if none are specified
-                font_family = "Arial"
-                
-                # Try to parse existing font settings
-                try:
-                    if isinstance(current_font, str):
-                        font_parts = current_font.split()
-                        if len(font_parts) >= 2:
-                            font_family = font_parts[0]
-                except (ValueError, IndexError):
-                    # If parsing fails, use defaults
-                    pass
-                
-                # Calculate maximum width
-                max_width = canvas_width * 0.8
-                
-                # Create temporary text to measure width
-                if i == 1:  # Middle row
-                    test_font = (font_family, font_size_large)
-                else:
-                    test_font = (font_family, font_size_small)
-                text_width = self.canvas.create_text(0, 0, text=word, font=test_font)
-                bbox = self.canvas.bbox(text_width)
-                self.canvas.delete(text_width)
-                
-                if bbox and bbox[2] - bbox[0] > max_width:
-                    # Calculate new font size
-                    if i == 1:  # Middle row
-                        new_size = int(font_size_large * max_width / (bbox[2] - bbox[0]))
-                    else:
-                        new_size = int(font_size_small * max_width / (bbox[2] - bbox[0]))
-                    new_size = max(12, min(new_size, 48))  # Keep size within reasonable bounds
-                    self.canvas.itemconfig(text_item, font=(font_family, new_size, "bold"))
-                else:
-                    # Apply the current font settings
-                    if i == 1:  # Middle row
-                        self.canvas.itemconfig(text_item, font=(font_family, font_size_large, "bold"))
-                    else:
-                        self.canvas.itemconfig(text_item, font=(font_family, font_size_small, "bold"))
-
-
-    def get_word_chunk(self, index, chunk_size, words):
-        if index < 0 or index >= len(words):
-            return ""
-        end = min(index + chunk_size, len(words))
-        return " ".join(words[index:end])
-    
+                # Shrink the font if the word doesn't fit, using cached widths
+                new_size = self.text_measurer.fit_font_size(
+                    word, self.font_family, self.row_font_sizes[i], max_width)
+                self.renderer.itemconfig(self.canvas, text_item, text=word,
+                                         font=(self.font_family, new_size, "bold"))
+            else:
+                self.renderer.itemconfig(self.canvas, text_item, text="")
+
+    def update_focus_row(self, word, focus):
+        """Draw the current word with its focus letter pinned to the center line.
+
+        focus is the (focus index, offset, width) the engine laid out at
+        compile time, at the layout's font size; fitting and placing the
+        word is arithmetic on those numbers.
+        """
+        text_item = self.text_items[1]
+        if not word:
+            self.current_x = None
+            self.renderer.itemconfig(self.canvas, text_item, text="")
+            self.renderer.itemconfig(self.canvas, self.focus_item, text="")
+            return
+        if focus is None:
+            focus = self.engine.focus_layout.measure(word)
+        index, offset, width = focus
+        center_x, positions, max_width = self.canvas_layout
+
+        # Shrink the font until both sides of the focus letter fit
+        base_size = self.engine.focus_layout.size
+        size = base_size
+        widest_side = max(offset, width - offset)
+        if widest_side > max_width / 2:
+            size = max(12, int(base_size * max_width / 2 / widest_side))
+        font = (self.font_family, size, "bold")
+        self.current_x = round(center_x - offset * size / base_size)
+
+        self.renderer.itemconfig(self.canvas, text_item, text=word, font=font)
+        self.renderer.coords(self.canvas, text_item, self.current_x, positions[1])
+        self.renderer.itemconfig(self.canvas, self.focus_item, text=word[index], font=font)
+
+    def item_positions(self):
+        """Resting (x, y) of the three rows and the focus letter, for transitions."""
+        center_x, positions, _ = self.canvas_layout
+        current_x = center_x if self.current_x is None else self.current_x
+        return ((center_x, positions[0]), (current_x, positions[1]),
+                (center_x, positions[2]), (center_x, positions[1]))
+
+
+    def render_frame(self, frame):
+        """Draw one playback frame; runs on the Tk main thread."""
+        calls = self.tcl_counter.calls
+        start = time.perf_counter()
+        word_changed = frame.current_chunk != self.displayed_words[1]
+        self.update_display(frame.prev_chunk, frame.current_chunk, frame.next_chunk,
+                            frame.focus)
+        if word_changed:
+            engine = self.engine
+            self.transitions.start(self.theme_manager.palette, self.item_positions(),
+                                   engine.base_delay * engine.words_per_chunk)
+        displayed = time.perf_counter()
+
+        # Update both progress bars; a tenth of a percent is under a pixel
+        progress = round(frame.progress, 1)
+        self.renderer.config(self.progress_bar, value=progress)
+        self.renderer.config(self.reading_progress_bar, value=progress)
+        progressed = time.perf_counter()
+
+        self.update_time_remaining(frame.seconds_remaining)
+        end = time.perf_counter()
+
+        self.profiler.record(start, end - start, displayed - start,
+                             progressed - displayed, end - progressed,
+                             frame.lateness, start - frame.created,
+                             self.tcl_counter.calls - calls)
+        if frame.created:
+            # Queueing and drawing time, so adaptive speed can allow for it
+            self.engine.report_render_cost(end - frame.created)
+        # Slow renders leave less room for transition steps
+        self.transitions.render_cost += 0.1 * (end - start - self.transitions.render_cost)
+        # A few refreshes a second is plenty and keeps the overlay cheap
+        if self.overlay_visible and end - self.overlay_updated >= 0.25:
+            self.overlay_updated = end
+            self.update_overlay()
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.renderer.itemconfig(self.canvas, self.overlay_item,
+                                 state="normal" if self.overlay_visible else "hidden")
+        if self.overlay_visible:
+            self.update_overlay()
+
+    def update_overlay(self):
+        summary = self.profiler.summary()
+        stats = self.engine.pacer.stats()
+        self.renderer.itemconfig(self.canvas, self.overlay_item, text=(
+            f"{summary['fps']:5.1f} fps  "
+            f"frame p50 {summary['render_p50_ms']:.2f} ms  "
+            f"p99 {summary['render_p99_ms']:.2f} ms\n"
+            f"{stats['actual_wpm']:5.0f} wpm  "
+            f"late p99 {summary['lateness_p99_ms']:.1f} ms  "
+            f"{summary['tcl_calls_per_frame']:.1f} Tcl calls/frame"))
+
+    def export_profile(self):
+        """Save recorded frame timings as JSON or, for *.trace.json, a Chrome trace."""
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Chrome trace", "*.trace.json"), ("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            if path.endswith(".trace.json"):
+                self.profiler.export_chrome_trace(path)
+            else:
+                self.profiler.export_json(path, {"pacer": self.engine.pacer.stats()})
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export timings: {e}")
+
+    # ReaderView: the engine calls these from its reader thread, so frames
+    # are handed to the pump and drawn on the Tk main thread
+
+    def show_frame(self, frame):
+        self.frame_pump.push(frame)
+
+    def reading_finished(self):
+        self.frame_pump.push(FINISHED)
+
+    def expect_frame(self):
+        # A seek while paused draws one frame; the pump is otherwise asleep
+        if self.engine.paused:
+            self.frame_pump.expect()
+
+    def seek_to_pointer(self, event):
+        width = self.reading_progress_bar.winfo_width()
+        if width > 0:
+            self.engine.seek_fraction(event.x / width)
+            self.expect_frame()
+
+    def seek_sentences(self, count):
+        self.engine.seek_sentences(count)
+
+    def seek_paragraphs(self, count):
+        self.engine.seek_paragraphs(count)
+
+    def seek_to_time_entry(self):
+        if self.engine.schedule is None:
+            return
+        try:
+            seconds = parse_timestamp(self.goto_entry.get())
+        except ValueError:
+            messagebox.showwarning("Warning", "Enter a time as mm:ss.")
+            return
+        self.engine.seek_to_time(seconds)
+        self.expect_frame()
+
+    def on_reading_finished(self):
+        # Skip if a new session was started before the pump got here
+        if not self.engine.running:
+            self.stop_reading()
+        if self.engine.load_error:
+            messagebox.showerror("Error", f"Failed to load file: {self.engine.load_error}")
+
     def get_font_size(self, label):
         font = label.cget("font")
         if font:
@@ -285,94 +504,12 @@ class SpeedReader:
     def on_window_resize(self, event):
         """Handle main window resize events"""
         if event.widget == self.root:
-            # If we have a canvas, update its text positions
-            if hasattr(self, 'canvas') and hasattr(self, 'text_items'):
-                self.canvas.update_idletasks()
-                center_x = self.canvas.winfo_width() // 2
-                center_y = self.canvas.winfo_height() // 2
-                spacing = 80  # Vertical spacing between lines
-                
-                # Update position for each text item
-                positions = [center_y - spacing, center_y, center_y + spacing]
-                for text_item, y_pos in zip(self.text_items, positions):
-                    self.canvas.coords(text_item, center_x, y_pos)
-                    
-                    # Get current text for this item
-                    current_text = self.canvas.itemcget(text_item, "text")
-                    if current_text:
-                        # Check if text needs resizing
-                        window_width = self.root.winfo_width()
-                        max_width = window_width * 0.8
-                        
-                        # Create temporary text to measure width
-                        current_font = self.canvas.itemcget(text_item, "font")
-                        font_family, font_size = current_font.split()
-                        test_font = (font_family, int(font_size))
-                        temp_text = self.canvas.create_text(0, 0, text=current_text, font=test_font)
-                        bbox = self.canvas.bbox(temp_text)
-                        self.canvas.delete(temp_text)
-                        
-                        if bbox and bbox[2] - bbox[0] > max_width:
-                            # Calculate new font size
-                            new_size = int(int(font_size) * max_width / (bbox[2] - bbox[0]))
-                            new_size = max(12, min(new_size, 48))  # Keep size within reasonable bounds
-                            self.canvas.itemconfig(text_item, font=(font_family, new_size))
-    
-    def preprocess_text(self, text):
-        def number_to_words(match):
-            num = match.group(0)
-            try:
-                n = int(num)
-                if 0 <= n <= 999:
-                    return num
-                return num
-            except:
-                return num
-        
-        text = re.sub(r'\b\d+\b', number_to_words, text)
-        text = re.sub(r'([^\w\s])', r' \1 ', text)
-        return ' '.join(text.split())
-    
-    def calculate_word_delay(self, word):
-        delay = self.base_delay * self.words_per_chunk
-        
-        if len(word) > 8:
-            delay *= 1.5
-        elif len(word) > 6:
-            delay *= 1.25
-        
-        for punct, mult in self.punctuation_delays.items():
-            if punct in word:
-                delay *= mult
-                break
-        
-        return delay
-
-
-    def format_word_with_focus(self, word):
-        length = len(word)
-        focus_index = max(1, min(length - 1, length // 3))
-        
-        before_focus = word[:focus_index]
-        focus_char = word[focus_index]
-        after_focus = word[focus_index + 1:]
-        
-        return before_focus, focus_char, after_focus
-    
-    
-    def update_word_display(self, word):
-        before, focus, after = self.format_word_with_focus(word)
-        
-        display_text = f"{before}{focus}{after}"
-        self.word_display.config(text=display_text)
-        
-        self.focus_point.pack_configure(pady=(0, self.word_display.winfo_height() // 8))
+            self.request_layout()
     
     def setup_control_frame(self):
         self.label = tk.Label(self.control_frame, text="Speed Reader", 
                             font=("Arial", 24, "bold"))
         self.label.pack(pady=10)
-        self.theme_manager.apply_theme(self.label)
         
         self.progress_bar = ttk.Progressbar(self.control_frame, 
                                           length=600, mode='determinate')
@@ -384,11 +521,9 @@ class SpeedReader:
                               fg=self.theme_manager.get_theme(self.theme_manager.current_theme)["text_box_text"], 
                               insertbackground=self.theme_manager.get_theme(self.theme_manager.current_theme)["text_box_text"])
         self.text_box.pack(pady=10)
-        self.theme_manager.apply_theme(self.text_box)
         
         self.button_frame = tk.Frame(self.control_frame)
         self.button_frame.pack()
-        self.theme_manager.apply_theme(self.button_frame)
         
         self.start_button = ttk.Button(self.button_frame, text="Start", 
                                      command=self.handle_start_continue)
@@ -398,49 +533,99 @@ class SpeedReader:
                                     command=self.load_text)
         self.load_button.pack(side=tk.LEFT, padx=5, pady=5)
         
+        self.setup_search_ui()
         self.setup_settings_ui()
         
+    def setup_search_ui(self):
+        self.search_frame = tk.Frame(self.control_frame)
+        self.search_frame.pack(pady=5)
+        
+        self.search_entry = tk.Entry(self.search_frame, width=40, font=("Arial", 12))
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind('<Return>', lambda e: self.find_text())
+        
+        self.find_button = ttk.Button(self.search_frame, text="Find",
+                                    command=self.find_text)
+        self.find_button.pack(side=tk.LEFT, padx=5)
+        
+        self.search_label = tk.Label(self.control_frame, text="", font=("Arial", 10))
+        self.search_label.pack()
+        
+        # One line per occurrence; choosing one jumps playback there
+        self.search_results = tk.Listbox(self.control_frame, height=5, width=60,
+                                         font=("Arial", 10))
+        self.search_results.pack(pady=5)
+        self.search_results.bind('<<ListboxSelect>>', self.jump_to_result)
+        self.search_hits = []
+        
     def setup_settings_ui(self):
         self.settings_frame = tk.Frame(self.control_frame)
         self.settings_frame.pack(pady=10)
-        self.theme_manager.apply_theme(self.settings_frame)
         
         self.speed_label = tk.Label(self.settings_frame, 
-                                  text=f"WPM: {self.wpm}", 
+                                  text=f"WPM: {self.engine.wpm}", 
                                   font=("Arial", 12))
         self.speed_label.pack()
-        self.theme_manager.apply_theme(self.speed_label)
         
         self.speed_slider = ttk.Scale(self.settings_frame, from_=100, to=1000, 
                                     orient="horizontal", command=self.update_speed)
-        self.speed_slider.set(self.wpm)
+        self.speed_slider.set(self.engine.wpm)
         self.speed_slider.pack()
         
+        # Adaptive speed treats the slider as a target to ramp up to
+        self.adaptive_var = tk.BooleanVar(value=self.engine.adaptive is not None)
+        self.adaptive_check = ttk.Checkbutton(self.settings_frame, text="Adaptive speed",
+                                            variable=self.adaptive_var,
+                                            command=self.update_adaptive)
+        self.adaptive_check.pack()
+        
+        # Rare words get more time, common ones less, at the same WPM
+        self.difficulty_var = tk.BooleanVar(value=self.engine.difficulty is not None)
+        self.difficulty_check = ttk.Checkbutton(self.settings_frame,
+                                              text="Frequency-aware timing",
+                                              variable=self.difficulty_var,
+                                              command=self.update_difficulty)
+        self.difficulty_check.pack()
+        
         self.chunk_frame = tk.Frame(self.control_frame)
         self.chunk_frame.pack(pady=5)
-        self.theme_manager.apply_theme(self.chunk_frame)
         
         tk.Label(self.chunk_frame, text="Words per display:", 
                 font=("Arial", 12)).pack(side=tk.LEFT)
         
         self.chunk_spinbox = ttk.Spinbox(self.chunk_frame, from_=1, to=5, width=5,
                                        command=self.update_chunk_size)
-        self.chunk_spinbox.set(1)
+        self.chunk_spinbox.set(self.engine.words_per_chunk)
         self.chunk_spinbox.pack(side=tk.LEFT, padx=5)
         
+        self.transition_frame = tk.Frame(self.control_frame)
+        self.transition_frame.pack(pady=5)
+        
+        tk.Label(self.transition_frame, text="Transition:", 
+                font=("Arial", 12)).pack(side=tk.LEFT)
+        
+        self.transition_var = tk.StringVar(value=self.transitions.mode)
+        self.transition_menu = ttk.Combobox(self.transition_frame,
+                                          textvariable=self.transition_var,
+                                          values=TransitionEngine.MODES,
+                                          state="readonly", width=7)
+        self.transition_menu.bind("<<ComboboxSelected>>", self.update_transition)
+        self.transition_menu.pack(side=tk.LEFT, padx=5)
+        
         self.stats_frame = tk.Frame(self.control_frame)
         self.stats_frame.pack(pady=5)
-        self.theme_manager.apply_theme(self.stats_frame)
         
         self.time_label = tk.Label(self.stats_frame, text="Time remaining: 0:00", 
                                  font=("Arial", 12))
         self.time_label.pack()
-        self.theme_manager.apply_theme(self.time_label)
+        
+        self.rate_label = tk.Label(self.stats_frame, text="", 
+                                 font=("Arial", 10))
+        self.rate_label.pack()
         
         # Theme selection
         self.theme_label = tk.Label(self.settings_frame, text="Theme:")
         self.theme_label.pack()
-        self.theme_manager.apply_theme(self.theme_label)
         
         self.theme_var = tk.StringVar()
         self.theme_var.set(self.theme_manager.current_theme)
@@ -459,88 +644,24 @@ class SpeedReader:
         self.theme_button.pack()
     
     def apply_theme(self):
-        theme = self.theme_manager.get_theme(self.theme_var.get())  # Get theme from theme_var
-        self.theme_manager.current_theme = self.theme_var.get()  # Update current_theme
-
-        self.theme_manager.apply_theme(self.reading_frame)
-        self.theme_manager.apply_theme(self.control_frame)
-        self.theme_manager.apply_theme(self.progress_container)
-        self.theme_manager.apply_theme(self.display_container)
-
-        if hasattr(self, 'canvas'):
-            self.canvas.configure(bg=theme["background"])
-
-            for i, text_item in enumerate(self.text_items):
-                if i == 1:
-                    self.canvas.itemconfig(text_item, fill=theme["accent"])
-                else:
-                    self.canvas.itemconfig(text_item, fill=self.fade_color(theme["text"], 0.3))
-
-        self.label.config(
-            bg=theme["background"],
-            fg=theme["text"]
-        )
-        self.speed_label.config(
-            bg=theme["background"],
-            fg=theme["text"]
-        )
-        self.time_label.config(
-            bg=theme["background"],
-            fg=theme["text"]
-        )
-        self.reading_time_label.config(
-            bg=theme["background"],
-            fg=theme["text"]
-        )
-        self.theme_label.config(
-            bg=theme["background"],
-            fg=theme["text"]
-        )
-        self.text_box.config(
-            bg=theme["text_box_background"],
-            fg=theme["text_box_text"],
-            insertbackground=theme["text_box_text"]
-        )
-
-        self.start_button.config(
-            style=f"{self.theme_manager.current_theme}.TButton"
-        )
-        self.load_button.config(
-            style=f"{self.theme_manager.current_theme}.TButton"
-        )
-        self.reading_pause_button.config(
-            style=f"{self.theme_manager.current_theme}.TButton"
-        )
-        self.reading_stop_button.config(
-            style=f"{self.theme_manager.current_theme}.TButton"
-        )
-        self.theme_button.config(
-            style=f"{self.theme_manager.current_theme}.TButton"
-        )
-
-        self.reading_progress_bar.configure(
-            style=f"{self.theme_manager.current_theme}.Horizontal.TProgressbar"
-        )
-
-        self.progress_bar.configure(
-            style=f"{self.theme_manager.current_theme}.Horizontal.TProgressbar"
-        )
-        self.speed_slider.configure(
-            style=f"{self.theme_manager.current_theme}.Horizontal.TScale"
-        )
-        self.chunk_spinbox.configure(
-            style=f"{self.theme_manager.current_theme}.TSpinbox"
-        )
-        self.theme_menu.configure(
-            style=f"{self.theme_manager.current_theme}.TCombobox"
-        )
+        # Restyles every registered widget in one pass, no tree walks
+        self.transitions.finish()
+        theme = self.theme_manager.set_theme(self.theme_var.get())
+        self.theme_var.set(theme.name)
+        self.configure_styles() # Refresh styles
 
+        # Canvas items take precomputed colors from the compiled palette
+        for item, color in zip(self.transitions.items, self.transitions.colors):
+            self.renderer.itemconfig(self.canvas, item, fill=theme[color])
+        self.renderer.itemconfig(self.canvas, self.overlay_item, fill=theme["overlay_text"])
 
-        self.configure_styles() # Refresh styles
+        self.session_store.record_settings(theme=theme.name)
     
     def handle_start_continue(self):
-        if self.paused:
-            self.paused = False
+        if self.engine.paused:
+            self.engine.resume()
+            self.frame_pump.start()
+            self.reading_pause_button.config(text="Pause")
             self.show_reading_frame()
         else:
             self.start_reading()
@@ -555,125 +676,187 @@ class SpeedReader:
         
     def update_chunk_size(self):
         try:
-            self.words_per_chunk = int(self.chunk_spinbox.get())
+            words_per_chunk = int(self.chunk_spinbox.get())
         except ValueError:
-            self.words_per_chunk = 1
+            words_per_chunk = 1
             self.chunk_spinbox.set(1)
+        self.engine.set_words_per_chunk(words_per_chunk)
+        self.session_store.record_settings(words_per_chunk=words_per_chunk)
+    
+    def update_transition(self, event=None):
+        self.transitions.finish()
+        self.transitions.mode = self.transition_var.get()
+        self.session_store.record_settings(transition=self.transitions.mode)
+    
+    def update_adaptive(self):
+        enabled = self.adaptive_var.get()
+        self.engine.set_adaptive(enabled)
+        self.session_store.record_settings(adaptive=enabled)
+    
+    def update_difficulty(self):
+        enabled = self.engine.set_difficulty(self.difficulty_var.get())
+        if self.difficulty_var.get() and not enabled:
+            messagebox.showerror(
+                "Error",
+                "Frequency-aware timing needs a word-frequency lexicon built from "
+                "your own books, and none could be loaded. Build one with:\n\n"
+                "python speed_reader.py lexicon <folder of books>")
+            self.difficulty_var.set(False)
+        self.session_store.record_settings(difficulty=enabled)
     
     def update_speed(self, value):
-        self.wpm = int(float(value))
-        self.speed_label.config(text=f"WPM: {self.wpm}")
-        self.base_delay = 60 / self.wpm  # Recalculate base_delay!
+        wpm = int(float(value))
+        self.speed_label.config(text=f"WPM: {wpm}")
+        self.engine.set_wpm(wpm)
+        self.session_store.record_settings(wpm=wpm)
     
     def load_text(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt")])
+        file_path = filedialog.askopenfilename(filetypes=READABLE_FILE_TYPES)
         if file_path:
             try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    self.text = file.read()
+                if should_stream(file_path):
+                    # Only a preview goes into the text box; reading streams the file
+                    self.stream_path = file_path
+                    self.text = ""
+                    self.text_box.delete("1.0", tk.END)
+                    self.text_box.insert(tk.END, read_preview(file_path))
+                else:
+                    self.stream_path = None
+                    self.text = read_text(file_path)
                     self.text_box.delete("1.0", tk.END)
                     self.text_box.insert(tk.END, self.text)
+                self.text_box.edit_modified(False)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load file: {str(e)}")
     
     
     
-    def update_time_remaining(self, words_remaining):
-        minutes_remaining = (words_remaining / self.words_per_chunk) * (60 / self.wpm)
-        minutes = int(minutes_remaining)
-        seconds = int((minutes_remaining - minutes) * 60)
+    def update_time_remaining(self, seconds_remaining):
+        minutes, seconds = divmod(int(seconds_remaining), 60)
         time_text = f"Time remaining: {minutes}:{seconds:02d}"
-        # Update both time labels
-        self.time_label.config(text=time_text)
-        self.reading_time_label.config(text=time_text)
+        # Update both time labels; the text only changes once a second
+        self.renderer.config(self.time_label, text=time_text)
+        self.renderer.config(self.reading_time_label, text=time_text)
     
-    def start_reading(self):
-        self.text = self.text_box.get("1.0", tk.END).strip()
-        if not self.text:
-            messagebox.showwarning("Warning", "Please enter or load some text first.")
+    def update_rate_stats(self):
+        """Show the delivered reading rate next to the slider setting."""
+        if self.engine.compile_error is not None:
+            self.rate_label.config(
+                text=f"Settings not applied: {self.engine.compile_error}")
             return
+        stats = self.engine.pacer.stats()
+        if stats["frames_shown"]:
+            adaptive = self.engine.adaptive
+            pace = f"Pace: {adaptive.current_wpm:.0f} WPM, " if adaptive is not None else ""
+            self.rate_label.config(
+                text=f"{pace}Delivered: {stats['actual_wpm']:.0f} WPM "
+                     f"(jitter {stats['jitter_ms']:.1f} ms, "
+                     f"{stats['frames_skipped']} skipped)")
+    
+    def start_reading(self):
+        # Stream the loaded file unless the preview has been edited since
+        streaming = self.stream_path is not None and not self.text_box.edit_modified()
+        if not streaming:
+            self.text = self.text_box.get("1.0", tk.END).strip()
+            if not self.text:
+                messagebox.showwarning("Warning", "Please enter or load some text first.")
+                return
             
-        if not self.running:
-            self.running = True
-            self.paused = False
-            self.current_word_index = 0
-            self.words = self.text.split()
-            self.progress_bar["maximum"] = len(self.words)
-            self.progress_bar["value"] = 0
+        if not self.engine.running:
+            try:
+                if streaming:
+                    self.engine.start(stream_path=self.stream_path)
+                else:
+                    self.engine.start(text=self.text)
+            except OSError as e:
+                # Moved or deleted since it was loaded
+                messagebox.showerror("Error", f"Failed to open file: {str(e)}")
+                return
+            # Progress values are percentages
+            self.progress_bar["maximum"] = 100
+            self.renderer.config(self.progress_bar, value=0)
             self.show_reading_frame()
-            thread = threading.Thread(target=self.run_reader)
-            thread.daemon = True
-            thread.start()
+            self.profiler.reset()
+            self.frame_pump.start()
+    
+    def find_text(self):
+        """List the occurrences of the search box's words in the current text."""
+        query = self.search_entry.get().strip()
+        self.search_results.delete(0, tk.END)
+        self.search_hits = []
+        if not query:
+            self.search_label.config(text="")
+            return
+        if self.engine.search_index is None:
+            self.search_label.config(text="Start reading to search this text")
+            return
+        hits = self.engine.search(query)
+        document = self.engine.document
+        self.search_hits = hits[:MAX_SEARCH_RESULTS]
+        for position in self.search_hits:
+            # A few words either side, as they appear in the text
+            start = max(0, position - 6)
+            snippet = " ".join(document[start:position + 10])
+            self.search_results.insert(tk.END, f"{position + 1}: {snippet}")
+        status = f"{len(hits)} found"
+        if len(hits) > MAX_SEARCH_RESULTS:
+            status += f", showing the first {MAX_SEARCH_RESULTS}"
+        if not self.engine.search_index.complete:
+            status += " so far (still indexing)"
+        self.search_label.config(text=status)
+    
+    def jump_to_result(self, event=None):
+        selection = self.search_results.curselection()
+        if not selection:
+            return
+        position = self.search_hits[selection[0]]
+        if not self.engine.running:
+            self.start_reading()
+            self.engine.seek_to_word(position)
+        else:
+            self.engine.seek_to_word(position)
+            if self.engine.paused:
+                self.pause_reading()  # continue from the occurrence
     
     def pause_reading(self):
-        if self.running:
-            self.paused = not self.paused
-            if self.paused:
+        if self.engine.running:
+            if not self.engine.paused:
+                self.engine.pause()
+                # No frames come while paused, so let Tk sleep
+                self.frame_pump.suspend()
                 self.reading_pause_button.config(text="Continue")
                 self.start_button.config(text="Start")
+                self.update_rate_stats()
                 self.show_control_frame()
             else:
+                self.engine.resume()
+                self.frame_pump.start()
                 self.reading_pause_button.config(text="Pause")
                 self.start_button.config(text="Continue")
                 self.show_reading_frame()
     
     def stop_reading(self):
-        self.running = False
-        self.paused = False
-        self.progress_bar["value"] = 0
-        self.time_label.config(text="Time remaining: 0:00")
+        self.engine.stop()
+        self.frame_pump.stop()
+        self.transitions.finish()
+        self.renderer.config(self.progress_bar, value=0)
+        self.update_time_remaining(0)
         self.reading_pause_button.config(text="Pause")
         self.start_button.config(text="Start")
+        self.update_rate_stats()
         self.show_control_frame()
     
-    def run_reader(self):
-        text = self.preprocess_text(self.text)
-        self.words = text.split()
-        total_words = len(self.words)
-
-        while self.current_word_index < total_words:
-            if not self.running:
-                break
-            if self.paused:
-                time.sleep(0.1)
-                continue
-
-
-            prev_chunk = self.get_word_chunk(self.current_word_index - self.words_per_chunk, 
-                                            self.words_per_chunk, self.words)
-            current_chunk = self.get_word_chunk(self.current_word_index, 
-                                                self.words_per_chunk, self.words)
-            next_chunk = self.get_word_chunk(self.current_word_index + self.words_per_chunk, 
-                                            self.words_per_chunk, self.words)
-
-            self.update_display(prev_chunk, current_chunk, next_chunk)
-
-            # Update both progress bars
-            progress_value = (self.current_word_index / total_words) * 100
-            self.progress_bar["value"] = progress_value
-            self.reading_progress_bar["value"] = progress_value
-
-            self.update_time_remaining(total_words - self.current_word_index)
-
-           # Calculate delay for each word in the chunk
-            chunk_words = current_chunk.split()
-            if chunk_words: #check if list is empty
-                delay = sum(self.calculate_word_delay(word) for word in chunk_words) / len(chunk_words)
-
-                # Adjust delay for chunk size.  IMPORTANT: No longer divide.
-                # The individual word delays already consider the number of words displayed.
-                # Multiplying by chunk size makes it much slower.
-            else:
-                delay = self.base_delay #if chunk is empty use the base delay
-
-            time.sleep(delay)  # Use the calculated delay
-
-            self.current_word_index += self.words_per_chunk
-            
-        if self.running:
-            self.stop_reading()
+    def on_close(self):
+        self.engine.close()
+        self.session_store.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # Headless commands, e.g. `python speed_reader.py preprocess book.txt`
+        from cli import main
+        sys.exit(main())
     root = tk.Tk()
     app = SpeedReader(root)
     root.mainloop()
@@ -0,0 +1,110 @@
+# test_engine.py
+"""Headless playback control; run with `python -m unittest`."""
+import threading
+import time
+import unittest
+
+from engine import ReaderView, ReadingEngine
+
+TEXT = " ".join(f"w{i}" for i in range(2000))
+
+
+class RecordingView(ReaderView):
+
+    def __init__(self):
+        self.frames = []
+        self.finished = threading.Event()
+        self.shown = threading.Condition()
+
+    def show_frame(self, frame):
+        with self.shown:
+            self.frames.append(frame)
+            self.shown.notify_all()
+
+    def reading_finished(self):
+        self.finished.set()
+
+    def wait_for(self, predicate, timeout=5.0):
+        """Wait until predicate(frames) is true; returns whether it became so."""
+        with self.shown:
+            return self.shown.wait_for(lambda: predicate(self.frames), timeout)
+
+
+class EngineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.view = RecordingView()
+        self.engine = ReadingEngine(view=self.view, wpm=6000)
+
+    def tearDown(self):
+        self.engine.stop()
+        if self.engine.reader is not None:
+            self.engine.reader.join(5)
+
+    def test_plays_to_the_end(self):
+        words = ["One", "two", "three", ".", "Four", "five", "six", "!"]
+        self.engine.start("One two three. Four five six!")
+        self.assertTrue(self.view.finished.wait(5))
+        shown = [frame.current_chunk for frame in self.view.frames]
+        # Frames can be dropped on a loaded machine, but never the last one,
+        # and never shown out of order
+        self.assertEqual(shown[-1], "!")
+        self.assertEqual(shown, [word for word in words if word in shown])
+        self.assertFalse(self.engine.running)
+
+    def test_pause_stops_frames_and_resume_continues(self):
+        self.engine.start(TEXT)
+        self.assertTrue(self.view.wait_for(lambda frames: len(frames) >= 3))
+        self.engine.pause()
+        self.assertTrue(self.engine.paused)
+        shown = len(self.view.frames)
+        time.sleep(0.2)  # twenty frames' worth of time
+        # At most the frame the reader was drawing as it was paused
+        self.assertLessEqual(len(self.view.frames), shown + 1)
+        shown = len(self.view.frames)
+        self.engine.resume()
+        self.assertTrue(self.view.wait_for(lambda frames: len(frames) >= shown + 3))
+
+    def test_seek_while_paused_shows_the_target(self):
+        self.engine.start(TEXT)
+        self.assertTrue(self.view.wait_for(lambda frames: len(frames) >= 1))
+        self.engine.pause()
+        self.engine.seek_to_word(1500)
+        self.assertTrue(self.view.wait_for(
+            lambda frames: frames[-1].current_chunk == "w1500"))
+        self.assertEqual(self.engine.current_word_index, 1500)
+        self.assertTrue(self.engine.paused)
+
+    def test_seek_while_playing(self):
+        self.engine.start(TEXT)
+        self.assertTrue(self.view.wait_for(lambda frames: len(frames) >= 1))
+        self.engine.seek_to_word(1000)
+        self.assertTrue(self.view.wait_for(
+            lambda frames: any(frame.current_chunk == "w1000" for frame in frames)))
+
+    def test_stop_then_start(self):
+        self.engine.start(TEXT)
+        self.assertTrue(self.view.wait_for(lambda frames: len(frames) >= 1))
+        first = self.engine.reader
+        self.engine.stop()
+        self.assertFalse(self.engine.running)
+        self.assertTrue(self.engine.start("Second text here"))
+        # The earlier reader was waited for before the new one began
+        self.assertFalse(first.is_alive())
+        self.assertTrue(self.view.wait_for(
+            lambda frames: frames[-1].current_chunk == "Second"))
+
+    def test_one_reader_at_a_time(self):
+        self.assertTrue(self.engine.start(TEXT))
+        readers = [self.engine.reader]
+        self.assertFalse(self.engine.start(TEXT))
+        self.assertIs(self.engine.reader, readers[0])
+        for _ in range(20):
+            self.engine.stop()
+            self.engine.start(TEXT)
+            readers.append(self.engine.reader)
+        self.assertEqual([reader.is_alive() for reader in readers[:-1]], [False] * 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
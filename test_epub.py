@@ -0,0 +1,111 @@
+# test_epub.py
+"""EPUB and HTML ingestion; run with `python -m unittest`."""
+import os
+import tempfile
+import unittest
+import zipfile
+
+from document import Document
+from loader import iter_text_chunks
+from markup import epub_chapters
+
+CONTAINER = """<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>"""
+
+PACKAGE = """<?xml version="1.0"?>
+<package version="3.0" xmlns="http://www.idpf.org/2007/opf">
+  <manifest>
+    <item id="intro" href="text/a_intro.xhtml" media-type="application/xhtml+xml"/>
+    <item id="one" href="text/z_one.xhtml" media-type="application/xhtml+xml"/>
+    <item id="two" href="text/chapter%202.xhtml#start" media-type="application/xhtml+xml"/>
+    <item id="style" href="style.css" media-type="text/css"/>
+    <item id="notes" href="text/b_notes.xhtml" media-type="application/xhtml+xml"/>
+  </manifest>
+  <spine>
+    <itemref idref="one"/>
+    <itemref idref="style"/>
+    <itemref idref="two"/>
+    <itemref idref="one"/>
+    <itemref idref="missing"/>
+    <itemref idref="intro"/>
+  </spine>
+</package>"""
+
+
+def chapter(title, body):
+    return (f"<?xml version='1.0' encoding='utf-8'?><html><head><title>{title}</title>"
+            f"<style>p {{ color: red }}</style></head><body><h1>{title}</h1>"
+            f"<p>{body}</p><script>var x = 1;</script></body></html>")
+
+
+def write_epub(path, with_container=True):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as book:
+        book.writestr("mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+        if with_container:
+            book.writestr("META-INF/container.xml", CONTAINER)
+            book.writestr("OEBPS/content.opf", PACKAGE)
+        book.writestr("OEBPS/style.css", "p { margin: 0 }")
+        book.writestr("OEBPS/text/z_one.xhtml", chapter("One", "First &amp; foremost."))
+        book.writestr("OEBPS/text/chapter 2.xhtml", chapter("Two", "Then<br/>café."))
+        book.writestr("OEBPS/text/a_intro.xhtml", chapter("Intro", "Last, by spine."))
+        book.writestr("OEBPS/text/b_notes.xhtml", chapter("Notes", "Not in the spine."))
+
+
+def read_words(path, chunk_size=1 << 16):
+    document = Document.from_text("".join(text for text, _ in
+                                          iter_text_chunks(path, chunk_size=chunk_size)))
+    return list(document[0:len(document)])
+
+
+class EpubTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.epub")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_spine_order(self):
+        write_epub(self.path)
+        with zipfile.ZipFile(self.path) as book:
+            self.assertEqual(epub_chapters(book), ["OEBPS/text/z_one.xhtml",
+                                                   "OEBPS/text/chapter 2.xhtml",
+                                                   "OEBPS/text/a_intro.xhtml"])
+
+    def test_text_follows_the_spine(self):
+        write_epub(self.path)
+        expected = ["One", "First", "&", "foremost", ".", "Two", "Then", "café", ".",
+                    "Intro", "Last", ",", "by", "spine", "."]
+        # Small reads split tags, entities and characters across pieces
+        for chunk_size in (1, 7, 1 << 16):
+            self.assertEqual(read_words(self.path, chunk_size), expected, chunk_size)
+
+    def test_chapters_are_paragraphs(self):
+        write_epub(self.path)
+        text = "".join(piece for piece, _ in iter_text_chunks(self.path))
+        document = Document.from_text(text)
+        # Each heading and paragraph starts a new paragraph
+        self.assertEqual(len(document.paragraph_starts), 6)
+
+    def test_without_a_package_document(self):
+        write_epub(self.path, with_container=False)
+        with zipfile.ZipFile(self.path) as book:
+            self.assertEqual(epub_chapters(book), ["OEBPS/text/a_intro.xhtml",
+                                                   "OEBPS/text/b_notes.xhtml",
+                                                   "OEBPS/text/chapter 2.xhtml",
+                                                   "OEBPS/text/z_one.xhtml"])
+
+    def test_not_a_zip(self):
+        with open(self.path, "wb") as file:
+            file.write(b"plain text, not a zip")
+        with self.assertRaises(ValueError):
+            list(iter_text_chunks(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
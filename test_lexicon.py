@@ -0,0 +1,117 @@
+# test_lexicon.py
+"""Lexicon files and the difficulty model; run with `python -m unittest`."""
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from lexicon import (DifficultyModel, Lexicon, build_lexicon, count_words,
+                     default_user_lexicon_path, load_default_lexicon)
+
+
+class LexiconTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "lexicon.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ranks_round_trip(self):
+        rng = random.Random(23)
+        ranked = list(dict.fromkeys(
+            "".join(rng.choice("abcéøz日") for _ in range(rng.randint(1, 8)))
+            for _ in range(3000)))
+        build_lexicon(ranked, self.path)
+        lexicon = Lexicon(self.path)
+        self.assertEqual(len(lexicon), len(ranked))
+        for rank, word in enumerate(ranked, 1):
+            self.assertEqual(lexicon.rank(word), rank, word)
+        self.assertIsNone(lexicon.rank("missing"))
+        sample = rng.sample(ranked, 200) + ["missing", "zzzzzzzzz"]
+        self.assertEqual(lexicon.ranks_for(sample),
+                         {word: ranked.index(word) + 1 for word in sample
+                          if word in ranked})
+
+    def test_repeated_word_keeps_its_first_rank(self):
+        build_lexicon(["the", "of", "the", "and"], self.path)
+        lexicon = Lexicon(self.path)
+        self.assertEqual(len(lexicon), 3)
+        self.assertEqual(lexicon.ranks_for(["the", "of", "and"]),
+                         {"the": 1, "of": 2, "and": 4})
+
+    def test_invalid_files(self):
+        build_lexicon(["the", "of", "and"], self.path)
+        with open(self.path, "rb") as file:
+            data = file.read()
+        for damaged in (b"", b"not a lexicon at all", data[:-1], data + b"x",
+                        b"XXXX" + data[4:]):
+            with open(self.path, "wb") as file:
+                file.write(damaged)
+            with self.assertRaises(ValueError):
+                Lexicon(self.path)
+
+    def test_default_lexicon_is_the_users(self):
+        with mock.patch.dict(os.environ, {"XDG_CONFIG_HOME": self.directory.name}):
+            self.assertIsNone(load_default_lexicon())
+            build_lexicon(["the", "of"], default_user_lexicon_path())
+            self.assertEqual(load_default_lexicon().rank("of"), 2)
+
+    def test_count_words(self):
+        path = os.path.join(self.directory.name, "book.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("The cat, the DOG and 3 cats. The end!")
+        _, counts, error = count_words(path)
+        self.assertIsNone(error)
+        self.assertEqual(counts, {"the": 3, "cat": 1, "dog": 1, "and": 1,
+                                  "cats": 1, "end": 1})
+        self.assertIsNotNone(count_words(path + ".missing")[2])
+
+
+class DifficultyModelTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.directory.name, "lexicon.bin")
+        build_lexicon([f"w{rank}" if rank > 3 else ["the", "of", "and"][rank - 1]
+                       for rank in range(1, 20001)], path)
+        cls.model = DifficultyModel(Lexicon(path))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_factor_rises_with_rank(self):
+        model = self.model
+        self.assertEqual(model.factor(1), model.easiest)
+        self.assertEqual(model.factor(model.common_rank), model.easiest)
+        self.assertEqual(model.factor(None), model.hardest)
+        self.assertAlmostEqual(model.factor(model.rare_rank), model.hardest)
+        factors = [model.factor(rank) for rank in range(1, 30000, 97)]
+        self.assertEqual(factors, sorted(factors))
+
+    def test_factors_average_one_over_words(self):
+        tokens = ["The", "cat", "of", "the", "and", ",", "2024", "zebra", ".", "THE"]
+        factors = self.model.factors(tokens)
+        self.assertEqual(len(factors), len(tokens))
+        words = [factor for token, factor in zip(tokens, factors) if token.isalpha()]
+        self.assertAlmostEqual(sum(words) / len(words), 1.0)
+        # Punctuation and numbers keep their delay
+        for token, factor in zip(tokens, factors):
+            if not token.isalpha():
+                self.assertEqual(factor, 1.0, token)
+        # Case doesn't matter, and unlisted words get more time than common ones
+        self.assertEqual(factors[0], factors[3])
+        self.assertEqual(factors[0], factors[9])
+        self.assertGreater(factors[1], factors[0])
+        self.assertEqual(factors[1], factors[7])
+
+    def test_only_punctuation(self):
+        self.assertEqual(list(self.model.factors([".", ",", "42"])), [1.0, 1.0, 1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
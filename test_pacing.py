@@ -0,0 +1,109 @@
+# test_pacing.py
+"""Deadline pacing on a virtual clock; run with `python -m unittest`."""
+import threading
+import unittest
+
+from pacing import DeadlineScheduler
+
+
+class Clock:
+    """Time that only moves when slept through or advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def scheduler(max_lateness=0.5):
+    clock = Clock()
+    return clock, DeadlineScheduler(max_lateness=max_lateness, clock=clock,
+                                    sleep=clock.sleep)
+
+
+class DeadlineSchedulerTests(unittest.TestCase):
+
+    def test_render_time_does_not_drift(self):
+        clock, pacer = scheduler()
+        pacer.start()
+        for frame in range(100):
+            self.assertEqual(pacer.wait(), 0.0)
+            clock.now += 0.03  # drawing the frame
+            pacer.advance(0.1)
+        # Each frame started on its deadline despite the time spent drawing
+        self.assertAlmostEqual(clock.now, 100 * 0.1 - 0.1 + 0.03)
+
+    def test_small_lateness_is_caught_up(self):
+        clock, pacer = scheduler()
+        pacer.start()
+        pacer.wait()
+        pacer.advance(0.1)
+        clock.now += 0.25  # a stall shorter than max_lateness
+        self.assertAlmostEqual(pacer.wait(), 0.15)
+        pacer.advance(0.1)
+        pacer.advance(0.1)
+        # No sleep beyond the original deadlines
+        self.assertEqual(pacer.wait(), 0.0)
+        self.assertAlmostEqual(clock.now, 0.3)
+
+    def test_overdue_frames_are_skipped(self):
+        clock, pacer = scheduler(max_lateness=10)
+        pacer.start()
+        clock.now += 0.35
+        delays = [0.1] * 10
+        index = 0
+        while pacer.is_overdue(delays[index]):
+            pacer.skip(delays[index])
+            index += 1
+        self.assertEqual(index, 3)
+        self.assertAlmostEqual(pacer.wait(), 0.05)
+        pacer.advance(delays[index])
+        self.assertEqual(pacer.stats()["frames_skipped"], 3)
+        self.assertEqual(pacer.stats()["frames_shown"], 1)
+
+    def test_long_stall_rebases(self):
+        clock, pacer = scheduler(max_lateness=0.5)
+        pacer.start()
+        pacer.wait()
+        pacer.advance(0.1)
+        clock.now += 5.0
+        self.assertEqual(pacer.wait(), 0.0)
+        pacer.advance(0.1)
+        pacer.wait()
+        # Paced from the end of the stall, not bursting to catch up
+        self.assertAlmostEqual(clock.now, 5.0 + 0.1)
+
+    def test_rescale_stretches_the_current_wait(self):
+        clock, pacer = scheduler()
+        pacer.start()
+        pacer.advance(1.0)
+        clock.now += 0.5
+        pacer.rescale(2.0)
+        pacer.wait()
+        self.assertAlmostEqual(clock.now, 1.5)
+
+    def test_interrupt_cuts_the_wait_short(self):
+        pacer = DeadlineScheduler()
+        pacer.start()
+        pacer.advance(30.0)
+        threading.Timer(0.05, pacer.interrupt).start()
+        self.assertIsNone(pacer.wait())
+
+    def test_stats_exclude_stopped_time(self):
+        clock, pacer = scheduler()
+        pacer.start()
+        for _ in range(10):
+            pacer.wait()
+            pacer.advance(0.1, words=2)
+        pacer.wait()
+        pacer.stop()
+        clock.now += 100.0  # paused
+        self.assertAlmostEqual(pacer.stats()["actual_wpm"], 20 / 1.0 * 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+# test_pipeline.py
+"""Invariants of the text pipeline; run with `python -m unittest`."""
+import codecs
+import os
+import random
+import tempfile
+import unittest
+
+from document import Document
+from document_cache import DocumentCache, key_for_text
+from loader import DetectingDecoder, iter_text_chunks, whole_words
+from parallel import add_shard, split_shards, tokenize_shard
+from tokenizer import tokenize_paragraphs
+
+# Pieces random texts are built from: words, punctuation, non-ASCII text
+# and every kind of whitespace run, including paragraph breaks
+PIECES = ["the", "Reader", "naïve", "façade", "日本語", "x", "2024", "well-known",
+          ".", ",", "!", "?", ";", "\"", "(", ")", "—", "Mr.", "...",
+          " ", " ", " ", "  ", "\t", "\n", "\n\n", "\n \n", "\n\n\n"]
+
+
+def random_text(rng, length):
+    return "".join(rng.choice(PIECES) for _ in range(length))
+
+
+def contents(document):
+    """Everything a Document records, as plain lists for comparison."""
+    return (list(document[0:len(document)]), list(document.sentence_starts),
+            list(document.paragraph_starts))
+
+
+class ShardTests(unittest.TestCase):
+    """Parallel tokenizing must give exactly the serial token stream."""
+
+    def test_shards_match_serial(self):
+        rng = random.Random(12)
+        for _ in range(300):
+            text = random_text(rng, rng.randint(0, 400))
+            document = Document()
+            for shard in split_shards(text, rng.randint(1, 40)):
+                add_shard(document, tokenize_shard(shard))
+            self.assertEqual(contents(document), contents(Document.from_text(text)),
+                             repr(text))
+
+    def test_streamed_pieces_match_serial(self):
+        rng = random.Random(34)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.txt")
+            for _ in range(100):
+                text = random_text(rng, rng.randint(0, 400))
+                with open(path, "w", encoding="utf-8", newline="") as file:
+                    file.write(text)
+                document = Document()
+                for piece, _ in iter_text_chunks(path, chunk_size=rng.randint(1, 64)):
+                    document.extend(*tokenize_paragraphs(piece))
+                self.assertEqual(contents(document), contents(Document.from_text(text)),
+                                 repr(text))
+
+    def test_whole_words_never_splits_a_word(self):
+        rng = random.Random(56)
+        for _ in range(300):
+            text = random_text(rng, rng.randint(0, 200))
+            cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 5)))
+            pieces = [(text[a:b], b) for a, b in zip([0] + cuts, cuts + [len(text)])]
+            joined = [piece for piece, _ in whole_words(pieces)]
+            self.assertEqual("".join(joined), text)
+            # Every piece but the last ends just before a run of whitespace
+            end = 0
+            for piece in joined[:-1]:
+                end += len(piece)
+                self.assertFalse(piece[-1].isspace(), repr(text))
+                self.assertTrue(text[end].isspace(), repr(text))
+
+
+class CacheTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = random.Random(78)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DocumentCache(directory)
+            for _ in range(20):
+                text = random_text(rng, rng.randint(0, 400))
+                document = Document()
+                # Several blocks, as a streamed load leaves them
+                for shard in split_shards(text, 50):
+                    add_shard(document, tokenize_shard(shard))
+                key = key_for_text(text)
+                cache.store(key, document)
+                self.assertEqual(contents(cache.load(key)), contents(document))
+
+    def test_corrupt_entry_is_a_miss(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DocumentCache(directory)
+            cache.store("k", Document.from_text("Some words. And more."))
+            with open(cache.entry_path("k"), "r+b") as file:
+                file.truncate(20)
+            self.assertIsNone(cache.load("k"))
+
+
+def decode(data, step=None):
+    decoder = DetectingDecoder()
+    if step is None:
+        return decoder.decode(data, final=True)
+    text = "".join(decoder.decode(data[i:i + step]) for i in range(0, len(data), step))
+    return text + decoder.decode(b"", final=True)
+
+
+class DecoderTests(unittest.TestCase):
+    TEXT = "Café — “naïve” résumé. " * 50
+
+    def test_byte_order_marks(self):
+        for encoding in ("utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "utf-32"):
+            data = self.TEXT.encode(encoding)
+            if encoding == "utf-16-le":
+                data = codecs.BOM_UTF16_LE + data
+            elif encoding == "utf-16-be":
+                data = codecs.BOM_UTF16_BE + data
+            for step in (None, 1, 3, 1000):
+                self.assertEqual(decode(data, step), self.TEXT, (encoding, step))
+
+    def test_utf8_and_windows_1252(self):
+        for encoding in ("utf-8", "cp1252"):
+            data = self.TEXT.encode(encoding)
+            for step in (None, 1, 3, 1000):
+                self.assertEqual(decode(data, step), self.TEXT, (encoding, step))
+
+    def test_fallback_after_long_ascii_prefix(self):
+        text = "plain words " * 10000 + "café"
+        self.assertEqual(decode(text.encode("cp1252"), 65536), text)
+
+    def test_bad_byte_after_utf8_in_the_same_read(self):
+        data = ("é" * 10).encode() + b"\xff ok"
+        expected = "é" * 10 + "� ok"
+        self.assertEqual(decode(data), expected)
+        self.assertEqual(decode(data, 1), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
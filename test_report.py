@@ -0,0 +1,65 @@
+# test_report.py
+"""Reading-time reports; run with `python -m unittest`."""
+import math
+import os
+import random
+import tempfile
+import unittest
+
+from document import Document
+from engine import DEFAULT_PUNCTUATION_DELAYS
+from report import ReadingReport, report_file
+from schedule import compile_schedule
+from tokenizer import tokenize
+
+WORDS = ["the", "reader", "naïve", "2024", "well-known", ".", ",", "!", "?", ";",
+         ":", "—", "Mr.", "...", "\n\n"]
+
+
+class ReportTests(unittest.TestCase):
+    """A report must agree with the schedule the reader would play."""
+
+    def assert_matches_schedule(self, report, text, wpm, size):
+        schedule = compile_schedule(Document.from_text(text), wpm, size,
+                                    DEFAULT_PUNCTUATION_DELAYS)
+        self.assertEqual(report.chunks, len(schedule), repr(text))
+        self.assertEqual(report.tokens, schedule.compiled_words, repr(text))
+        self.assertTrue(math.isclose(report.total_seconds, schedule.total_time,
+                                     rel_tol=1e-9, abs_tol=1e-9), repr(text))
+
+    def test_totals_match_schedule(self):
+        rng = random.Random(13)
+        for _ in range(200):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 300)))
+            wpm = rng.choice([120, 300, 1000])
+            size = rng.randint(1, 5)
+            report = ReadingReport("text", wpm, size, DEFAULT_PUNCTUATION_DELAYS)
+            tokens = tokenize(text)
+            # Fed in uneven batches, as report_file reads a file
+            start = 0
+            while start < len(tokens):
+                stop = start + rng.randint(1, 50)
+                report.feed(tokens[start:stop])
+                start = stop
+            self.assert_matches_schedule(report.finish(), text, wpm, size)
+
+    def test_report_file(self):
+        text = "It was late. The reader, tired, stopped; then went on!\n\n" * 40
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+            result = report_file(path, 300, 2, DEFAULT_PUNCTUATION_DELAYS)
+            missing = report_file(os.path.join(directory, "gone.txt"), 300, 2,
+                                  DEFAULT_PUNCTUATION_DELAYS)
+        report = ReadingReport(path, 300, 2, DEFAULT_PUNCTUATION_DELAYS)
+        report.feed(tokenize(text))
+        self.assert_matches_schedule(report.finish(), text, 300, 2)
+        self.assertEqual(result, report.as_dict())
+        self.assertEqual(result["words"], 40 * 10)
+        self.assertEqual(result["pauses"]["."]["count"], 40)
+        self.assertIn("error", missing)
+
+
+if __name__ == "__main__":
+    unittest.main()
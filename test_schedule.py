@@ -0,0 +1,70 @@
+# test_schedule.py
+"""Invariants of compiled schedules; run with `python -m unittest`."""
+import math
+import random
+import unittest
+
+from document import Document
+from engine import DEFAULT_PUNCTUATION_DELAYS
+from schedule import ReadingSchedule, compile_schedule
+
+WORDS = ["the", "reader", "naïve", "2024", "well-known", ".", ",", "!", "?", ";",
+         "(", ")", "—", "Mr.", "...", "\n\n"]
+
+
+def random_document(rng, length):
+    return Document.from_text(" ".join(rng.choice(WORDS) for _ in range(length)))
+
+
+class ScheduleTests(unittest.TestCase):
+
+    def test_prefix_sums(self):
+        rng = random.Random(7)
+        for _ in range(100):
+            document = random_document(rng, rng.randint(0, 300))
+            schedule = compile_schedule(document, rng.choice([150, 300, 900]),
+                                        rng.randint(1, 4), DEFAULT_PUNCTUATION_DELAYS)
+            total = 0.0
+            for index in range(len(schedule)):
+                self.assertTrue(math.isclose(schedule.elapsed[index], total, abs_tol=1e-9))
+                self.assertTrue(math.isclose(schedule.remaining_time(index),
+                                             math.fsum(schedule.delays[index:]),
+                                             abs_tol=1e-9))
+                total += schedule.delays[index]
+            self.assertTrue(math.isclose(schedule.total_time, total, abs_tol=1e-9))
+            self.assertEqual(schedule.remaining_time(len(schedule)), 0.0)
+
+    def test_chunk_lookups(self):
+        rng = random.Random(8)
+        document = random_document(rng, 500)
+        schedule = compile_schedule(document, 300, 3, DEFAULT_PUNCTUATION_DELAYS)
+        for index in range(len(schedule)):
+            self.assertEqual(schedule.chunk_at_time(schedule.elapsed[index]), index)
+            start = schedule.chunk_starts[index]
+            for word in range(start, start + schedule.chunk_word_count(index)):
+                self.assertEqual(schedule.chunk_at_word(word), index)
+        self.assertEqual(schedule.chunk_at_time(schedule.total_time + 1), len(schedule) - 1)
+
+    def test_extending_matches_one_compile(self):
+        # A streamed file is compiled a batch at a time
+        rng = random.Random(9)
+        for _ in range(50):
+            document = random_document(rng, rng.randint(0, 300))
+            size = rng.randint(1, 4)
+            whole = compile_schedule(document, 300, size, DEFAULT_PUNCTUATION_DELAYS)
+            schedule = ReadingSchedule(document, 300, size, DEFAULT_PUNCTUATION_DELAYS)
+            count = 0
+            while count < len(document):
+                count = min(len(document), count + rng.randint(1, 40))
+                schedule.extend_to(count, final=False)
+                self.assertEqual(schedule.compiled_words % size, 0)
+            schedule.extend_to(len(document))
+            self.assertTrue(schedule.complete)
+            self.assertEqual(list(schedule.chunk_starts), list(whole.chunk_starts))
+            for a, b in zip(schedule.delays, whole.delays):
+                self.assertTrue(math.isclose(a, b, abs_tol=1e-9))
+            self.assertTrue(math.isclose(schedule.total_time, whole.total_time, abs_tol=1e-9))
+
+
+if __name__ == "__main__":
+    unittest.main()
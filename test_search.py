@@ -0,0 +1,99 @@
+# test_search.py
+"""In-document search and jumping to a hit; run with `python -m unittest`."""
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+from document import Document
+from engine import ReaderView, ReadingEngine
+from search import SearchIndex
+from tokenizer import tokenize
+
+WORDS = ["the", "The", "reader", "READER", "naïve", "2024", "well", "known",
+         ".", ",", "!", "—", "\n\n"]
+
+
+def expected_positions(tokens, query):
+    query = [token.lower() for token in query]
+    lowered = [token.lower() for token in tokens]
+    return [i for i in range(len(lowered) - len(query) + 1)
+            if lowered[i:i + len(query)] == query]
+
+
+class SearchIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(24)
+        self.document = Document.from_text(" ".join(rng.choice(WORDS) for _ in range(20000)))
+        self.tokens = list(self.document[0:len(self.document)])
+        self.index = SearchIndex(self.document)
+        # Indexed in uneven steps, as the background thread does
+        start = 0
+        while start < len(self.document):
+            stop = min(len(self.document), start + rng.randint(1, 3000))
+            self.index.add(start, stop)
+            start = stop
+
+    def check_queries(self):
+        for word in ["the", "READER", "naïve", "2024", "missing"]:
+            self.assertEqual(list(self.index.positions(word)),
+                             expected_positions(self.tokens, [word]), word)
+        for phrase in ["the reader", "well known the", "reader, the", "naïve — 2024"]:
+            self.assertEqual(list(self.index.search(phrase)),
+                             expected_positions(self.tokens, tokenize(phrase)), phrase)
+        self.assertEqual(list(self.index.search("!")), [])
+
+    def test_before_freeze(self):
+        self.assertFalse(self.index.complete)
+        self.check_queries()
+
+    def test_after_freeze(self):
+        before = self.index.nbytes()
+        self.index.freeze()
+        self.assertTrue(self.index.complete)
+        self.check_queries()
+        self.assertLess(self.index.nbytes(), before)
+
+    def test_phrase_at_the_start(self):
+        index = SearchIndex(Document.from_text("The reader reads. The reader stops."))
+        index.add(0, 8)
+        self.assertEqual(list(index.search("the reader")), [0, 4])
+        # A query led by punctuation is matched from its first word
+        self.assertEqual(list(index.search(". The")), [3])
+
+
+class FirstFrameView(ReaderView):
+
+    def __init__(self, word):
+        self.word = word
+        self.seen = threading.Event()
+
+    def show_frame(self, frame):
+        if frame.current_chunk == self.word:
+            self.seen.set()
+
+
+class JumpTests(unittest.TestCase):
+
+    def test_jump_into_a_file_still_streaming(self):
+        # Seeking right after start, before the target has been loaded
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(" ".join(f"w{i}" for i in range(300000)))
+            view = FirstFrameView("w250000")
+            engine = ReadingEngine(view=view, wpm=60)
+            engine.start(stream_path=path)
+            try:
+                engine.seek_to_word(250000)
+                self.assertTrue(view.seen.wait(30))
+                self.assertEqual(engine.current_word_index, 250000)
+            finally:
+                engine.stop()
+                engine.reader.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
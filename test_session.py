@@ -0,0 +1,83 @@
+# test_session.py
+"""Session journal replay and compaction; run with `python -m unittest`."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import session
+from session import SessionStore
+
+
+class SessionStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state", "session.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def reopen(self):
+        return SessionStore(self.path).load()
+
+    def test_round_trip(self):
+        store = SessionStore(self.path)
+        store.record_settings(wpm=450, theme="dark")
+        store.record_position("a", 10)
+        store.record_position("b", 20)
+        store.record_position("a", 30)
+        store.flush()
+        loaded = self.reopen()
+        self.assertEqual(loaded.get_position("a"), 30)
+        self.assertEqual(loaded.get_position("missing", "b"), 20)
+        self.assertEqual(loaded.get_position("missing"), 0)
+        self.assertEqual(loaded.settings, {"wpm": 450, "theme": "dark"})
+
+    def test_torn_last_line_is_skipped(self):
+        store = SessionStore(self.path)
+        store.record_position("a", 10)
+        store.flush()
+        # A crash in the middle of the next append
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write('{"document": "a", "wo')
+
+        loaded = self.reopen()
+        self.assertEqual(loaded.get_position("a"), 10)
+        # The next append starts on a fresh line, so it is not lost either
+        loaded.record_position("b", 5)
+        loaded.flush()
+        reloaded = self.reopen()
+        self.assertEqual(reloaded.get_position("a"), 10)
+        self.assertEqual(reloaded.get_position("b"), 5)
+
+    def test_missing_journal(self):
+        loaded = self.reopen()
+        self.assertEqual(loaded.positions, {})
+        self.assertEqual(loaded.settings, {})
+
+    def test_compaction(self):
+        with mock.patch.object(session, "COMPACT_AFTER", 50), \
+                mock.patch.object(session, "MAX_DOCUMENTS", 10):
+            store = SessionStore(self.path)
+            store.record_settings(wpm=300)
+            for step in range(200):
+                store.record_position(f"doc{step % 20}", step)
+                store.record_settings(wpm=300 + step)
+                store.flush()
+            with open(self.path, encoding="utf-8") as file:
+                lines = file.readlines()
+            self.assertLessEqual(len(lines), 50 + 2)
+            self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+            loaded = self.reopen()
+            self.assertEqual(loaded.settings, {"wpm": 499})
+            # Only the most recently read documents are kept
+            self.assertLessEqual(len(loaded.positions), 10 + 50)
+            self.assertEqual(loaded.get_position("doc19"), 199)
+            self.assertEqual(loaded.get_position("doc10"), 190)
+            self.assertEqual(loaded.positions.keys(), store.positions.keys())
+
+
+if __name__ == "__main__":
+    unittest.main()
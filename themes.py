@@ -1,6 +1,70 @@
+import json
+import os
+import re
 import tkinter as tk
 from tkinter import ttk
 
+HEX_COLOR_RE = re.compile(r"#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})")
+
+
+def parse_color(hex_color):
+    """(r, g, b) for a "#RRGGBB" or "#RGB" color."""
+    digits = hex_color[1:]
+    if len(digits) == 3:
+        digits = "".join(digit * 2 for digit in digits)
+    return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+
+
+def format_color(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+
+def mix_rgb(color, background, opacity):
+    """color drawn at the given opacity over background, both (r, g, b)."""
+    return tuple(int(c * opacity + b * (1 - opacity)) for c, b in zip(color, background))
+
+
+def default_user_themes_path():
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "focusflow", "themes.json")
+
+
+class Palette(dict):
+    """A theme compiled for drawing.
+
+    Holds the theme's own colors plus the mixed colors the reader uses,
+    computed once here instead of on every draw. Color ramps between two
+    colors are built on first use and cached.
+    """
+
+    # Derived color: (key, base color, opacity over the background)
+    MIXED = (("faded_text", "text", 0.3), ("overlay_text", "text", 0.6))
+
+    def __init__(self, name, colors):
+        super().__init__(colors)
+        self.name = name
+        self.rgb = {key: parse_color(value) for key, value in colors.items()}
+        background = self.rgb["background"]
+        for key, base, opacity in self.MIXED:
+            self[key] = format_color(mix_rgb(self.rgb[base], background, opacity))
+        self._ramps = {}
+
+    def mix(self, key, opacity):
+        """Theme color `key` at the given opacity over the background."""
+        return format_color(mix_rgb(self.rgb[key], self.rgb["background"], opacity))
+
+    def ramp(self, start, end, steps):
+        """steps + 1 colors going from color start to color end, both included."""
+        cache_key = (start, end, steps)
+        ramp = self._ramps.get(cache_key)
+        if ramp is None:
+            first, last = parse_color(self.get(start, start)), parse_color(self.get(end, end))
+            ramp = tuple(format_color(mix_rgb(last, first, step / steps))
+                         for step in range(steps + 1)) if steps else (self.get(end, end),)
+            self._ramps[cache_key] = ramp
+        return ramp
+
+
 class ThemeManager:
     def __init__(self):
         self.themes = {
@@ -42,32 +106,114 @@ class ThemeManager:
             }
         }
         self.current_theme = "dark"
+        self.palettes = {}
+        # Themed widgets and how to theme each, filled in by register()
+        self.widgets = {}
 
     def get_theme(self, name):
-        return self.themes.get(name, self.themes["dark"])
-
-    def apply_theme(self, widget):
-        theme = self.get_theme(self.current_theme)
-        if isinstance(widget, (tk.Tk, tk.Toplevel, tk.Frame)):
-            widget.configure(bg=theme["background"])
-            for child in widget.winfo_children():
-                self.apply_theme(child)
+        """Compiled Palette for a theme; unknown names fall back to dark."""
+        if name not in self.themes:
+            name = "dark"
+        palette = self.palettes.get(name)
+        if palette is None:
+            palette = self.palettes[name] = Palette(name, self.themes[name])
+        return palette
+
+    @property
+    def palette(self):
+        return self.get_theme(self.current_theme)
+
+    def load_user_themes(self, path=None):
+        """Add themes from a JSON file mapping names to color dicts.
+
+        A theme may name a "base" theme to take missing colors from
+        (default dark). Themes with colors that aren't #RGB or #RRGGBB are
+        skipped. Returns the names that were loaded.
+        """
+        try:
+            with open(path or default_user_themes_path(), "r", encoding="utf-8") as file:
+                user_themes = json.load(file)
+        except (OSError, ValueError):
+            return []
+        if not isinstance(user_themes, dict):
+            return []
+
+        loaded = []
+        for name, colors in user_themes.items():
+            if not isinstance(colors, dict):
+                continue
+            colors = dict(colors)
+            base = self.themes.get(colors.pop("base", "dark"), self.themes["dark"])
+            theme = dict(base, **colors)
+            if all(isinstance(value, str) and HEX_COLOR_RE.fullmatch(value)
+                   for value in theme.values()):
+                self.themes[name] = theme
+                self.palettes.pop(name, None)
+                loaded.append(name)
+        return loaded
+
+    def register(self, widget):
+        """Theme a widget now and on every later theme switch.
+
+        Only the widget itself is themed, not its children.
+        """
+        if isinstance(widget, (tk.Tk, tk.Toplevel, tk.Frame, tk.Canvas)):
+            role = "background"
         elif isinstance(widget, tk.Label):
-            widget.configure(
-                bg=theme["background"],
-                fg=theme["text"]
-            )
+            role = "label"
+        elif isinstance(widget, tk.Text) or (isinstance(widget, tk.Entry)
+                                             and not isinstance(widget, ttk.Widget)):
+            # ttk.Entry, Spinbox and Combobox subclass tk.Entry but take styles
+            role = "text_box"
+        elif isinstance(widget, tk.Listbox):
+            role = "list"
         elif isinstance(widget, ttk.Button):
-            widget.configure(
-                style=f"{self.current_theme}.TButton"
-            )
+            role = "TButton"
         elif isinstance(widget, ttk.Progressbar):
-            widget.configure(
-                style=f"{self.current_theme}.Horizontal.TProgressbar"
-            )
-        elif isinstance(widget, tk.Text):
-            widget.configure(
-                bg=theme["text_box_background"],
-                fg=theme["text_box_text"],
-                insertbackground=theme["text_box_text"]
-            )
\ No newline at end of file
+            role = "Horizontal.TProgressbar"
+        elif isinstance(widget, ttk.Scale):
+            role = "Horizontal.TScale"
+        elif isinstance(widget, ttk.Spinbox):
+            role = "TSpinbox"
+        elif isinstance(widget, ttk.Combobox):
+            role = "TCombobox"
+        elif isinstance(widget, ttk.Checkbutton):
+            role = "TCheckbutton"
+        else:
+            return
+        self.widgets[widget] = role
+        self._apply(widget, role, self.palette)
+
+    def register_tree(self, widget):
+        """Register a widget and everything under it; a one-time walk at setup."""
+        self.register(widget)
+        for child in widget.winfo_children():
+            self.register_tree(child)
+
+    def set_theme(self, name):
+        """Switch theme, restyling every registered widget in one pass."""
+        self.current_theme = name if name in self.themes else "dark"
+        palette = self.palette
+        for widget, role in list(self.widgets.items()):
+            try:
+                self._apply(widget, role, palette)
+            except tk.TclError:
+                # Destroyed since it was registered
+                del self.widgets[widget]
+        return palette
+
+    def _apply(self, widget, role, palette):
+        if role == "background":
+            widget.configure(bg=palette["background"])
+        elif role == "label":
+            widget.configure(bg=palette["background"], fg=palette["text"])
+        elif role == "text_box":
+            widget.configure(bg=palette["text_box_background"],
+                             fg=palette["text_box_text"],
+                             insertbackground=palette["text_box_text"])
+        elif role == "list":
+            widget.configure(bg=palette["text_box_background"],
+                             fg=palette["text_box_text"],
+                             selectbackground=palette["accent"])
+        else:
+            widget.configure(style=f"{palette.name}.{role}")
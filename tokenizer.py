@@ -0,0 +1,39 @@
+# tokenizer.py
+import re
+from array import array
+
+# Bump whenever the token stream produced for a given text changes, so
+# cached documents built by an older tokenizer are not reused
+TOKENIZER_VERSION = 1
+
+# A token is a run of word characters or a single punctuation mark; this is
+# exactly what padding punctuation with spaces and splitting produced.
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# A blank line, possibly containing other whitespace, separates paragraphs
+PARAGRAPH_BREAK_RE = re.compile(r"\n[^\S\n]*\n")
+
+
+def tokenize(text):
+    """Split text into word and punctuation tokens in a single pass."""
+    return TOKEN_RE.findall(text)
+
+
+def tokenize_paragraphs(text):
+    """Tokenize text and return (tokens, paragraph_starts).
+
+    paragraph_starts holds the token offset of every paragraph that begins
+    after a blank line in this text. The first paragraph is only included
+    when the text itself starts with a blank line, so pieces of a larger
+    document can be tokenized separately and stitched together.
+    """
+    tokens = []
+    paragraph_starts = array('I')
+    findall = TOKEN_RE.findall
+    for number, paragraph in enumerate(PARAGRAPH_BREAK_RE.split(text)):
+        paragraph_tokens = findall(paragraph)
+        if paragraph_tokens:
+            if number:
+                paragraph_starts.append(len(tokens))
+            tokens.extend(paragraph_tokens)
+    return tokens, paragraph_starts